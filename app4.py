@@ -1,61 +1,31 @@
 import streamlit as st
-from streamlit_gsheets import GSheetsConnection
 import plotly.graph_objects as go
 import plotly.colors as pc
 import pandas as pd
 
+from components import paged_table
+from data import get_mapping_feed, load_sheets, SPREADSHEET_URL
+from figures import PILE_HOVER_QUALITY, FigureCache, build_pile_figure, patch_axes
+
 # --- Konfigurasi Halaman Streamlit ---
 st.set_page_config(page_title="Rectangles from Google Sheet", layout="wide")
 
-# ===================== S U M B E R   D A T A =====================
-# URL 1 (lama) untuk mapping/rectangles
-SPREADSHEET_URL = "https://docs.google.com/sheets/d/1RNOBQG4m-zpdA2qAf1E1nUAI9QKJMUYGUYwUgIA-jrM/edit?gid=328753631#gid=328753631"
-
-# URL 2 (baru) untuk tabel reclaimer (kolom: tanggal, tiang_awal, tiang_ahir, ketinggian_boom)
-RECLAIMER_URL = "https://docs.google.com/spreadsheets/d/1RNOBQG4m-zpdA2qAf1E1nUAI9QKJMUYGUYwUgIA-jrM/edit?gid=1231789348#gid=1231789348"
-# Jika tab/worksheet-nya bernama "reclaimer", isi di sini; kalau tidak yakin, biarkan None agar baca sheet sesuai gid
-RECLAIMER_SHEET = None  # atau "reclaimer"
-
-# --- Koneksi ke Google Sheets ---
-conn = st.connection("gsheets", type=GSheetsConnection)
-
-@st.cache_data(ttl=60)
-def read_sheet(url: str, worksheet: str | None = None) -> pd.DataFrame:
-    """Helper baca sheet dgn fallback."""
-    try:
-        if worksheet:
-            df_ = conn.read(spreadsheet=url, worksheet=worksheet, ttl=5)
-        else:
-            df_ = conn.read(spreadsheet=url, ttl=5)
-    except Exception as e:
-        st.error(f"Gagal membaca Google Sheet.\nURL: {url}\nError: {e}")
-        st.stop()
-    df_.columns = [str(c).strip() for c in df_.columns]
-    return df_
-
 # ===================== B A C A   D A T A   U T A M A =====================
-df = read_sheet(SPREADSHEET_URL)
-# pastikan tanggal jadi datetime
-df["tanggal"] = pd.to_datetime(df["tanggal"], errors="coerce")
+# Sheet mapping sudah dibaca & dikonversi tipenya di lapisan data bersama (data.py)
+sheets = load_sheets("mapping", "reclaimer", "gform", required=("mapping",))  # semua sheet diambil bersamaan
+df = sheets["mapping"]
 
 # sort tanggal terbaru dulu
 df = df.sort_values("tanggal", ascending=False)
 
 st.subheader("History Data dari Google Sheets (Mapping)")
 kolom_tampil = ["tipe", "tongkang", "Ash_%", "Sulfur_%", "tanggal","tiang_start","tiang_end","Sudut Stacking"]
-st.dataframe(
+paged_table(
     df[[c for c in kolom_tampil if c in df.columns]],
-    use_container_width=True
+    key="app4_mapping", date_col="tanggal", filter_cols=["tipe", "tongkang"],
 )
 
-# --- Pembersihan dan Validasi Data ---
-if "tanggal" in df.columns:
-    df['tanggal'] = pd.to_datetime(df['tanggal'], errors='coerce', dayfirst=True)
-
-for col in ["tiang_start", "tiang_end", "lebar(tiang)", "sudut_start", "sudut_end", "Ash_%", "Sulfur_%"]:
-    if col in df.columns:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-
+# --- Validasi Data ---
 need_cols = ["tipe", "tiang_start", "tiang_end", "sudut_start", "sudut_end", "tongkang", "Ash_%", "Sulfur_%", "tanggal"]
 missing = [c for c in need_cols if c not in df.columns]
 if missing:
@@ -93,37 +63,25 @@ y_min_custom, y_max_custom = st.sidebar.slider(
     value=(y_min_default, y_max_default)
 )
 
-# --- Plotting dengan Plotly ---
+# --- Mode gambar pile: trace terisi per tipe jauh lebih ringan di tablet ---
+render_mode = "traces" if st.sidebar.toggle(
+    "Mode ringan (1 trace per tipe)",
+    value=False,
+    help="Gambar kotak pile sebagai satu trace per warna, bukan satu shape per pile."
+) else "shapes"
 
 
 # ===================== R E C L A I M E R   ( T A B E L   B A R U ) =====================
 st.subheader("History Data Posisi Reclaimer")
-df_reclaimer = read_sheet(RECLAIMER_URL, RECLAIMER_SHEET)
-
-# Normalisasi nama kolom agar aman (mis. ada spasi/kapital)
-df_reclaimer.columns = [c.strip() for c in df_reclaimer.columns]
-
-# Casting tipe data sesuai kolom yang kamu sebutkan
-if "tanggal" in df_reclaimer.columns:
-    df_reclaimer["tanggal"] = pd.to_datetime(df_reclaimer["tanggal"], errors="coerce", dayfirst=True)
-
-for num_col in ["tiang_awal", "tiang_ahir", "ketinggian_boom"]:
-    if num_col in df_reclaimer.columns:
-        df_reclaimer[num_col] = pd.to_numeric(df_reclaimer[num_col], errors="coerce")
+df_reclaimer = sheets["reclaimer"]
 
 # Urutan kolom sesuai permintaan (tampilkan yang ada saja biar aman)
 cols_order = [c for c in ["tanggal", "tiang_awal", "tiang_ahir", "ketinggian_boom"] if c in df_reclaimer.columns]
 
-# cara 2: tinggi dinamis (30px per baris, max 500px)
-n_rows = len(df_reclaimer)
-row_height = 30
-max_height = 500
-dynamic_height = min(n_rows * row_height + 30, max_height)
-
-st.dataframe(
+# hanya halaman aktif yang dikirim ke browser
+paged_table(
     df_reclaimer[cols_order] if cols_order else df_reclaimer,
-    use_container_width=True,
-    height=dynamic_height
+    key="app4_reclaimer", date_col="tanggal", filter_cols=["grup"],
 )
 
 st.caption("Sumber: URL reclaimer (gid=1231789348)")
@@ -132,199 +90,149 @@ st.caption("Sumber: URL reclaimer (gid=1231789348)")
 # --- Plotting dengan Plotly ---
 st.subheader("Mapping Coal Terbaru")
 
-# reset figure agar data lama tidak tersisa
-fig = go.Figure()
-fig.data = []                # hapus semua trace lama (scatter hover dsb.)
-fig.layout.shapes = []       # hapus semua kotak lama
-fig.layout.annotations = []  # hapus semua annotation lama
-
-# ===================== PLOTTING MAPPING =====================
-# mapping warna berdasarkan tipe
-color_map = {
-    "Coal Normal": "green",
-    "Coal Mix 2:1": "yellow",
-    "Coal HS": "red",
-    "Coal NS" : "green",
-    
-}
-
 # ===================== FILTER DATA TERBARU PER OVERLAP =====================
 
-def is_overlap(r1, r2, debug=False):
-    """True kalau dua area tiang & sudut saling tumpang tindih atau salah satunya di dalam yang lain."""
-    overlap_x = (r1["tiang_start"] < r2["tiang_end"]) and (r2["tiang_start"] < r1["tiang_end"])
-    overlap_y = not (r1["sudut_end"] <= r2["sudut_start"] or r1["sudut_start"] >= r2["sudut_end"])
-    result = overlap_x and overlap_y
-
-    if debug:
-        st.write(
-            f"Compare: {r1['tipe']} ({r1['tanggal']}) vs {r2['tipe']} ({r2['tanggal']}) → "
-            f"X overlap={overlap_x}, Y overlap={overlap_y}, RESULT={result}"
-        )
-
-    return result
-
-
-# urutkan berdasarkan tanggal (lama -> baru, jadi yang baru terakhir)
-df_sorted = df.sort_values("tanggal",ascending=False)
-
-selected_rows = []
-for _, row in df_sorted.iterrows():
-    if any(is_overlap(row, sel) for sel in selected_rows):
-        continue
-    selected_rows.append(row)
-
-
-# hasil final untuk plotting
-df_plot = pd.DataFrame(selected_rows)
+# hasil final untuk plotting: terbaru dulu, buang yang tertimpa data lebih baru
+# (state yard hanya memproses baris sheet yang baru sejak rerun sebelumnya)
+# pile = baris sheet mapping + laporan stacking GForm (dinormalisasi ke skema mapping, lihat ingest.py)
+feed = get_mapping_feed(SPREADSHEET_URL, "overlap")
+feed.update(sheets.warm)
+yard_state = feed.yard
+df_plot = yard_state.resolve()
 df_plot = df_plot.sort_values("tiang_start", ascending=True)
 #printkan hasil df_plot
-st.write(df_plot)
-
-# Reset figure
-fig = go.Figure()
-fig.data = []
-fig.layout.shapes = []
-fig.layout.annotations = []
-
-for i, r in df_plot.reset_index(drop=True).iterrows():
-    y0, y1 = float(r["sudut_start"]), float(r["sudut_end"])
-    x0, x1 = float(r["tiang_start"]), float(r["tiang_end"])
-
-    tipe = str(r["tipe"]).strip()
-    color = color_map.get(tipe, "lightgrey")
-
-    # kotak
-    fig.add_shape(
-        type="rect",
-        x0=x0, y0=y0, x1=x1, y1=y1,
-        line=dict(color=color, width=3),
-        fillcolor=color,
-        opacity=0.5,
-    )
-
-    # annotation teks (satu kali per kotak)
-    fig.add_annotation(
-        x=(x0 + x1) / 2,
-        y=(y0 + y1) / 2,
-        text=tipe,
-        showarrow=False,
-        font=dict(size=15, color="black"),
-        bgcolor="white",
-        opacity=0.7
-    )
-    fig.add_trace(
-        go.Scatter(
-            x=[(r["tiang_start"] + r["tiang_end"]) / 2],
-            y=[(r["sudut_start"] + r["sudut_end"]) / 2],
-            mode="markers",
-            marker=dict(size=20, opacity=0),  # lebih besar biar gampang hover
-            hoverinfo="text",
-            hovertext=(
-                f"<b>Tipe:</b> {r['tipe']}<br>"
-                f"<b>Tongkang:</b> {r['tongkang']}<br>"
-                f"<b>Ash:</b> {r['Ash_%'] if pd.notna(r['Ash_%']) else '-'}<br>"
-                f"<b>Sulfur:</b> {r['Sulfur_%'] if pd.notna(r['Sulfur_%']) else '-'}<br>"
-                f"<b>Tanggal:</b> {r['tanggal'].strftime('%Y-%m-%d') if pd.notna(r['tanggal']) else '-'}"
-            ),
-            showlegend=False
-        )
-    )
-
-
+paged_table(df_plot, key="app4_plot", date_col="tanggal", filter_cols=["tipe", "tongkang"])
 
 # ===================== INTEGRASI RECLAIMER =====================
 need_cols_recl = ["tiang_awal", "tiang_ahir", "tanggal"]
 df_recl_plot = df_reclaimer.dropna(subset=need_cols_recl).copy()
 
-# pastikan tipe data
-df_recl_plot["tanggal"] = pd.to_datetime(df_recl_plot["tanggal"], errors="coerce", dayfirst=True)
-for c in ["tiang_awal", "tiang_ahir", "ketinggian_boom"]:
-    if c in df_recl_plot.columns:
-        df_recl_plot[c] = pd.to_numeric(df_recl_plot[c], errors="coerce")
-
 # ambil hanya baris terbaru
 if not df_recl_plot.empty:
     latest_idx = df_recl_plot["tanggal"].idxmax()
     df_recl_plot = df_recl_plot.loc[[latest_idx]].copy()
 
-# Gambar kotak & titik boom
-for _, rr in df_recl_plot.iterrows():
-    x0r, x1r = float(rr["tiang_awal"]), float(rr["tiang_ahir"])
-    y0r, y1r = 0.0, 90.0
-
-    fig.add_shape(
-        type="rect",
-        x0=x0r, y0=y0r, x1=x1r, y1=y1r,
-        line=dict(color="grey", width=4, dash="dash"),
-        fillcolor="rgba(0,0,0,0)",
-        opacity=1.0,
-        layer="above"
-    )
 
-    fig.add_annotation(
-        x=(x0r + x1r) / 2,
-        y=(y0r + y1r) / 2,
-        text="Reclaimer",
-        showarrow=False,
-        font=dict(size=14, color="grey"),
-        align="center"
+def build_map_figure() -> go.Figure:
+    """Peta pile + reclaimer; rentang sumbu & posisi hover reclaimer di-patch terpisah."""
+    # Semua kotak, label, dan hover pile dibangun sekaligus (lihat figures.py)
+    fig = build_pile_figure(
+        df_plot,
+        hovertemplate=PILE_HOVER_QUALITY,
+        marker_size=20,  # lebih besar biar gampang hover
+        label_style=dict(bgcolor="white", opacity=0.7),
+        render=render_mode,
     )
 
-    if "ketinggian_boom" in rr and pd.notna(rr["ketinggian_boom"]):
-        x_center = (x0r + x1r) / 2
-        y_boom = float(rr["ketinggian_boom"])
-        tgl = rr["tanggal"].strftime("%Y-%m-%d") if pd.notna(rr["tanggal"]) else "-"
+    # Gambar kotak & titik boom
+    for _, rr in df_recl_plot.iterrows():
+        x0r, x1r = float(rr["tiang_awal"]), float(rr["tiang_ahir"])
+        y0r, y1r = 0.0, 90.0
+
+        fig.add_shape(
+            type="rect",
+            x0=x0r, y0=y0r, x1=x1r, y1=y1r,
+            line=dict(color="grey", width=4, dash="dash"),
+            fillcolor="rgba(0,0,0,0)",
+            opacity=1.0,
+            layer="above"
+        )
+
+        fig.add_annotation(
+            x=(x0r + x1r) / 2,
+            y=(y0r + y1r) / 2,
+            text="Reclaimer",
+            showarrow=False,
+            font=dict(size=14, color="grey"),
+            align="center"
+        )
+
+        if "ketinggian_boom" in rr and pd.notna(rr["ketinggian_boom"]):
+            x_center = (x0r + x1r) / 2
+            y_boom = float(rr["ketinggian_boom"])
+            tgl = rr["tanggal"].strftime("%Y-%m-%d") if pd.notna(rr["tanggal"]) else "-"
+
+            fig.add_trace(
+                go.Scatter(
+                    x=[x_center],
+                    y=[y_boom],
+                    mode="markers+text",
+                    marker=dict(size=10, color="red", symbol="circle"),
+                    text=[f"Boom {y_boom:.1f}"],
+                    textposition="top center",
+                    name=f"Boom {tgl}",
+                    hovertemplate=(
+                        f"<b>Reclaimer</b><br>"
+                        f"Tanggal: {tgl}<br>"
+                        f"Tiang: {int(x0r)} → {int(x1r)}<br>"
+                        f"Ketinggian boom: {y_boom:.2f}"
+                    ),
+                    showlegend=False
+                )
+            )
+
+    # Hover transparan di tengah kotak (y mengikuti slider, di-patch setelah ambil dari cache)
+    if not df_recl_plot.empty:
+        x_center = (df_recl_plot["tiang_awal"] + df_recl_plot["tiang_ahir"]) / 2
+
+        hover_text = df_recl_plot.apply(
+            lambda r: (
+                f"<b>Reclaimer</b><br>"
+                f"Tanggal: {r['tanggal'].strftime('%Y-%m-%d') if pd.notna(r['tanggal']) else '-'}<br>"
+                f"Tiang: {int(r['tiang_awal']) if pd.notna(r['tiang_awal']) else '-'} → "
+                f"{int(r['tiang_ahir']) if pd.notna(r['tiang_ahir']) else '-'}<br>"
+                f"Ketinggian boom: "
+                f"{('{:.2f}'.format(float(r['ketinggian_boom']))) if pd.notna(r['ketinggian_boom']) else '-'}"
+            ),
+            axis=1
+        )
 
         fig.add_trace(
             go.Scatter(
-                x=[x_center],
-                y=[y_boom],
-                mode="markers+text",
-                marker=dict(size=10, color="red", symbol="circle"),
-                text=[f"Boom {y_boom:.1f}"],
-                textposition="top center",
-                name=f"Boom {tgl}",
-                hovertemplate=(
-                    f"<b>Reclaimer</b><br>"
-                    f"Tanggal: {tgl}<br>"
-                    f"Tiang: {int(x0r)} → {int(x1r)}<br>"
-                    f"Ketinggian boom: {y_boom:.2f}"
-                ),
+                x=x_center,
+                y=[0.0] * len(df_recl_plot),
+                mode="markers",
+                marker=dict(size=0.1, opacity=0),
+                hoverinfo="text",
+                hovertext=hover_text,
+                name="reclaimer_hover",
                 showlegend=False
             )
         )
 
-# Hover transparan di tengah kotak
-if not df_recl_plot.empty:
-    x_center = (df_recl_plot["tiang_awal"] + df_recl_plot["tiang_ahir"]) / 2
-    y_center = (y_min_custom + y_max_custom) / 2
-
-    hover_text = df_recl_plot.apply(
-        lambda r: (
-            f"<b>Reclaimer</b><br>"
-            f"Tanggal: {r['tanggal'].strftime('%Y-%m-%d') if pd.notna(r['tanggal']) else '-'}<br>"
-            f"Tiang: {int(r['tiang_awal']) if pd.notna(r['tiang_awal']) else '-'} → "
-            f"{int(r['tiang_ahir']) if pd.notna(r['tiang_ahir']) else '-'}<br>"
-            f"Ketinggian boom: "
-            f"{('{:.2f}'.format(float(r['ketinggian_boom']))) if pd.notna(r['ketinggian_boom']) else '-'}"
-        ),
-        axis=1
+    # ===================== SETTING AXES & LAYOUT =====================
+    fig.update_xaxes(title="Nomor Tiang", dtick=1, showticklabels=True)
+    fig.update_yaxes(title="Sudut Stacking (derajat)",
+                     dtick=10, showticklabels=False, showline=True, linecolor="grey")
+    # Axis kanan (ketinggian boom reclaimer)
+    fig.update_layout(
+        yaxis2=dict(
+            title="Ketinggian Boom (m)",
+            range=[0, 10],
+            overlaying="y",   # share domain dengan y-axis kiri
+            side="right",
+            showline=True,
+            linecolor="red",
+            tickfont=dict(color="red")
+        )
     )
 
-    fig.add_trace(
-        go.Scatter(
-            x=x_center,
-            y=[y_center] * len(df_recl_plot),
-            mode="markers",
-            marker=dict(size=0.1, opacity=0),
-            hoverinfo="text",
-            hovertext=hover_text,
-            showlegend=False
-        )
+    fig.update_layout(
+        height=600,
+        margin=dict(l=10, r=10, t=50, b=10),
+        title="Visualisasi Posisi Coal Pile + Reclaimer (Outline)",
+        hovermode="closest",
+        dragmode=False,
+        legend=dict(title=None)
     )
+    return fig
+
+
+# Figure hanya dibangun ulang kalau versi sheet/mode gambar berubah; geser slider = patch sumbu saja
+data_version = sheets.version("mapping", "reclaimer", "gform")
+fig_cache = st.session_state.setdefault("fig_cache", FigureCache())
+fig = fig_cache.get("app4_peta", (data_version, render_mode), build_map_figure)
 
-# ===================== SETTING AXES & LAYOUT =====================
 if not df_recl_plot.empty:
     x_min_plot = float(min(x_min_custom, df_recl_plot["tiang_awal"].min()))
     x_max_plot = float(max(x_max_custom, df_recl_plot["tiang_ahir"].max()))
@@ -337,30 +245,10 @@ if not df_recl_plot.empty:
 else:
     y_min_plot, y_max_plot = y_min_custom, y_max_custom
 
-fig.update_xaxes(title="Nomor Tiang", range=[x_min_plot, x_max_plot], dtick=1, showticklabels=True)
-fig.update_yaxes(title="Sudut Stacking (derajat)", range=[y_min_plot, y_max_plot],
-                 dtick=10, showticklabels=False, showline=True, linecolor="grey")
-# Axis kanan (ketinggian boom reclaimer)
-fig.update_layout(
-    yaxis2=dict(
-        title="Ketinggian Boom (m)",
-        range=[0, 10],
-        overlaying="y",   # share domain dengan y-axis kiri
-        side="right",
-        showline=True,
-        linecolor="red",
-        tickfont=dict(color="red")
-    )
-)
-
-fig.update_layout(
-    height=600,
-    margin=dict(l=10, r=10, t=50, b=10),
-    title="Visualisasi Posisi Coal Pile + Reclaimer (Outline)",
-    hovermode="closest",
-    dragmode=False,
-    legend=dict(title=None)
-)
+patch_axes(fig, x_range=[x_min_plot, x_max_plot], y_range=[y_min_plot, y_max_plot])
+if not df_recl_plot.empty:
+    y_center = (y_min_custom + y_max_custom) / 2
+    fig.update_traces(y=[y_center] * len(df_recl_plot), selector=dict(name="reclaimer_hover"))
 
 st.plotly_chart(
     fig,
@@ -0,0 +1,266 @@
+"""
+Benchmark pipeline halaman mapping & app4 dengan history yard sintetis (tanpa Streamlit, tanpa jaringan).
+
+Contoh:
+    python bench.py --sizes 1000 10000 100000 --save bench/hasil.json
+    python bench.py --sizes 1000 10000 100000 --baseline bench/hasil.json
+
+Tiap tahap dijalankan `--repeat` kali dan diambil waktu tercepat. Dengan `--baseline`,
+laporan menampilkan rasio terhadap hasil lama dan keluar dengan kode 1 kalau ada
+tahap yang melambat lebih dari `--threshold` (mis. 0.2 = 20%).
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from export import export_range
+from figures import COLOR_MAP, PILE_HOVER, PILE_HOVER_QUALITY, build_pile_figure, build_playback_figure, \
+    build_surface_figure
+from grid import OccupancyGrid
+from ingest import MappingFeed
+from refresher import Warm
+from schema import GFORM_SCHEMA, MAPPING_SCHEMA, RECLAIMER_SCHEMA, apply_schema
+from segments import choose_lod, latest_profile, recent_segment_matrix, resample_segments, segment_matrix
+from volume import inventory_history
+from yard import SnapshotBuilder, YardState, boom_heights, build_snapshots, select_latest_piles
+
+N_TIANG = 35
+ROWS_PER_DAY = 20           # kepadatan history sintetis: baris mapping per hari
+MIN_ABS_REGRESSION = 0.005  # detik; selisih lebih kecil dari ini tidak dihitung regresi
+
+
+# ===================== D A T A   S I N T E T I S =====================
+def _timestamps(rng, n, days, start="2023-01-01"):
+    seconds = np.sort(rng.integers(0, days * 86400, n))
+    return pd.Timestamp(start) + pd.to_timedelta(seconds, unit="s")
+
+
+def _decimal(values) -> np.ndarray:
+    # angka sheet memakai koma desimal, seperti input dari Google Sheets
+    return np.char.replace(np.round(values, 2).astype(str), ".", ",")
+
+
+def synthetic_sheets(n_rows: int, seed=0) -> dict:
+    """
+    Sheet mentah (teks, seperti hasil `conn.read`) untuk mapping, reclaimer dan GForm.
+    Mapping `n_rows` baris, reclaimer & GForm masing-masing sepersepuluhnya, tersebar
+    di n_rows / ROWS_PER_DAY hari. Kolom segmen "Tiang d1-d2" sudah angka (~10% terisi).
+    """
+    rng = np.random.default_rng(seed)
+    days = max(30, n_rows // ROWS_PER_DAY)
+    tipes = np.array(list(COLOR_MAP))
+
+    ts = rng.integers(1, N_TIANG, n_rows)
+    ss = rng.integers(0, 17, n_rows) * 5
+    mapping = pd.DataFrame({
+        "tanggal": _timestamps(rng, n_rows, days).strftime("%Y-%m-%d %H:%M:%S"),
+        "tipe": tipes[rng.integers(0, len(tipes), n_rows)],
+        "tongkang": np.char.add("TK-", rng.integers(1, 200, n_rows).astype(str)),
+        "tiang_start": ts.astype(str),
+        "tiang_end": np.minimum(ts + rng.integers(1, 5, n_rows), N_TIANG).astype(str),
+        "sudut_start": ss.astype(str),
+        "sudut_end": np.minimum(ss + rng.integers(1, 7, n_rows) * 5, 90).astype(str),
+        "Ash_%": _decimal(rng.uniform(3, 12, n_rows)),
+        "Sulfur_%": _decimal(rng.uniform(0.1, 1.5, n_rows)),
+    })
+    segments = np.where(rng.random((n_rows, N_TIANG - 1)) < 0.1, rng.uniform(0, 15, (n_rows, N_TIANG - 1)), np.nan)
+    mapping = pd.concat([mapping, pd.DataFrame(segments, columns=[f"Tiang {i}-{i + 1}" for i in range(1, N_TIANG)])],
+                        axis=1)
+
+    n_small = max(n_rows // 10, 100)
+    ta = rng.integers(1, N_TIANG - 3, n_small)
+    reclaimer = pd.DataFrame({
+        "tanggal": _timestamps(rng, n_small, days).strftime("%Y-%m-%d %H:%M:%S"),
+        "grup": np.array(list("ABCD"))[rng.integers(0, 4, n_small)],
+        "tiang_awal": ta.astype(str),
+        "tiang_ahir": (ta + rng.integers(1, 4, n_small)).astype(str),
+        "ketinggian_boom": _decimal(rng.uniform(0, 15, n_small)),
+    })
+
+    ga = rng.integers(1, N_TIANG - 3, n_small)
+    sudut = rng.integers(0, 17, n_small) * 5
+    gform = pd.DataFrame({
+        "Timestamp": _timestamps(rng, n_small, days).strftime("%d/%m/%Y %H:%M:%S"),
+        "Grup": np.array(list("ABCD"))[rng.integers(0, 4, n_small)],
+        "Tiang Awal": ga.astype(str),
+        "Tiang Akhir": (ga + rng.integers(1, 4, n_small)).astype(str),
+        "Nama Tongkang": np.char.add("TK-", rng.integers(1, 200, n_small).astype(str)),
+        "Ada Stacking?": np.where(rng.random(n_small) < 0.7, "Ya", "Tidak"),
+        "Tipe Coal": tipes[rng.integers(0, len(tipes), n_small)],
+        "Sudut Stacking": np.char.add(np.char.add(sudut.astype(str), "-"), (sudut + 10).astype(str)),
+        "Ketinggian pile": _decimal(rng.uniform(0, 15, n_small)),
+    })
+    return {"mapping": mapping, "reclaimer": reclaimer, "gform": gform}
+
+
+# ===================== T A H A P   P I P E L I N E =====================
+def _yard(df, rule):
+    state = YardState(rule)
+    state.update(df)
+    return state
+
+
+def _page_dates(df):
+    # pilihan tanggal halaman mapping (sumber bawaan: reclaimer), urut lama -> baru
+    return [pd.Timestamp(d) for d in sorted(df["tanggal"].dropna().dt.normalize().unique())]
+
+
+def _selected_snapshot(yard_state, df_reclaimer):
+    # rerun pertama setelah data berubah: builder baru, hanya tanggal terpilih (terbaru) yang dibangun
+    dates = _page_dates(df_reclaimer)
+    return SnapshotBuilder(yard_state, df_reclaimer)[dates[-1]] if dates else None
+
+
+def _playback(yard_state, df_reclaimer, max_frames):
+    snapshots = SnapshotBuilder(yard_state, df_reclaimer)
+    days = _page_dates(df_reclaimer)[-max_frames:]
+    snapshots.prefetch(days)
+    frames = [(d.strftime("%d %B %Y"), snapshots[d].piles, snapshots[d].reclaimer) for d in days]
+    return build_playback_figure(frames, hovertemplate=PILE_HOVER)
+
+
+def _export(df, export_dir):
+    return export_range(df, os.path.join(export_dir, "mapping.csv"), "csv", "tanggal")
+
+
+def stages(max_dates: int, export_dir: str) -> list:
+    """
+    (nama, halaman, fungsi ctx -> hasil) urut pipeline; hasil disimpan di ctx[nama]
+    supaya tahap berikutnya bisa memakainya. Tahap mengikuti apa yang dijalankan halaman:
+    snapshot tanggal terpilih saja, playback `max_dates` tanggal terakhir, inventory atas
+    seluruh sheet; "snapshots semua tanggal" = playback rentang penuh (kasus terburuk).
+    """
+    return [
+        ("parse mapping", "mapping+app4", lambda c: apply_schema(c["raw"]["mapping"].copy(), MAPPING_SCHEMA)),
+        ("parse reclaimer", "mapping+app4", lambda c: apply_schema(c["raw"]["reclaimer"].copy(), RECLAIMER_SCHEMA)),
+        ("parse gform", "DataGform", lambda c: apply_schema(c["raw"]["gform"].copy(), GFORM_SCHEMA)),
+        ("select_latest_piles", "app4", lambda c: select_latest_piles(c["parse mapping"], "overlap")),
+        ("yard update (overlap)", "app4", lambda c: _yard(c["parse mapping"], "overlap")),
+        ("yard resolve (overlap)", "app4", lambda c: c["yard update (overlap)"].resolve()),
+        ("peta shapes", "app4", lambda c: build_pile_figure(c["yard resolve (overlap)"],
+                                                          hovertemplate=PILE_HOVER_QUALITY, render="shapes")),
+        ("peta traces", "app4", lambda c: build_pile_figure(c["yard resolve (overlap)"],
+                                                          hovertemplate=PILE_HOVER_QUALITY, render="traces")),
+        ("yard update (tiang)", "mapping", lambda c: _yard(c["parse mapping"], "tiang")),
+        ("ingest gform", "mapping", lambda c: MappingFeed(YardState("tiang")).update(
+            {"mapping": Warm(1, c["parse mapping"], 0.0), "gform": Warm(1, c["parse gform"], 0.0)})),
+        ("snapshot tanggal terpilih", "mapping", lambda c: _selected_snapshot(c["yard update (tiang)"],
+                                                                             c["parse reclaimer"])),
+        ("snapshots semua tanggal", "mapping", lambda c: build_snapshots(_page_dates(c["parse reclaimer"]),
+                                                                        c["yard update (tiang)"], c["parse reclaimer"])),
+        ("occupancy grid", "mapping", lambda c: OccupancyGrid(c["yard update (tiang)"].resolve())),
+        ("boom heights", "mapping", lambda c: boom_heights(c["parse reclaimer"])),
+        ("playback", "mapping", lambda c: _playback(c["yard update (tiang)"], c["parse reclaimer"], max_dates)),
+        ("segment matrix", "mapping", lambda c: segment_matrix(c["parse mapping"])),
+        ("segment 30 hari", "mapping", lambda c: recent_segment_matrix(c["parse mapping"])),
+        ("surface LOD", "mapping", lambda c: build_surface_figure(
+            resample_segments(c["segment matrix"], choose_lod(c["segment matrix"].tanggal)))),
+        ("profil terakhir", "mapping", lambda c: latest_profile(c["segment matrix"])),
+        ("inventory", "mapping", lambda c: inventory_history(c["yard update (tiang)"], c["parse mapping"])),
+        ("ekspor csv", "mapping", lambda c: _export(c["parse mapping"], export_dir)),
+    ]
+
+
+def run(sizes, repeat=3, max_dates=30, seed=0, only=None, log=print) -> dict:
+    """Waktu tercepat (detik) per ukuran per tahap: {ukuran: {tahap: detik}}."""
+    results = {}
+    with tempfile.TemporaryDirectory() as export_dir:
+        # pemanasan: import lazy plotly/pyarrow & cache regex tidak ikut terhitung di ukuran pertama
+        ctx = {"raw": synthetic_sheets(100, seed)}
+        for name, _, fn in stages(min(max_dates, 5), export_dir):
+            ctx[name] = fn(ctx)
+        for n in sizes:
+            ctx = {"raw": synthetic_sheets(n, seed)}
+            results[str(n)] = {}
+            for name, _, fn in stages(max_dates, export_dir):
+                best = float("inf")
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    ctx[name] = fn(ctx)
+                    best = min(best, time.perf_counter() - t0)
+                if only is None or name in only:
+                    results[str(n)][name] = best
+                    log(f"  {n:>9,} baris  {name:<24} {best * 1000:10.1f} ms")
+    return results
+
+
+# ===================== L A P O R A N =====================
+def report(results: dict, baseline: dict | None = None, threshold=0.2) -> tuple:
+    """Tabel markdown tahap × ukuran (ms), plus rasio vs baseline; kembalikan (teks, daftar regresi)."""
+    pages = {name: page for name, page, _ in stages(0, "")}
+    sizes = list(results)
+    names = list(dict.fromkeys(name for per_size in results.values() for name in per_size))
+    header = ["tahap", "halaman"] + [f"{int(n):,} baris (ms)" for n in sizes]
+    if baseline:
+        header += [f"{int(n):,} vs baseline" for n in sizes]
+    lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+    regressions = []
+    for name in names:
+        row = [name, pages.get(name, "")]
+        row += [f"{results[n][name] * 1000:.1f}" if name in results[n] else "-" for n in sizes]
+        if baseline:
+            for n in sizes:
+                old = baseline.get(n, {}).get(name)
+                new = results[n].get(name)
+                if old is None or new is None or old <= 0:
+                    row.append("-")
+                    continue
+                ratio = new / old
+                slower = ratio > 1 + threshold and new - old > MIN_ABS_REGRESSION
+                if slower:
+                    regressions.append((name, n, old, new))
+                row.append(f"{ratio:.2f}x" + (" **REGRESI**" if slower else ""))
+        lines.append("| " + " | ".join(row) + " |")
+    return "\n".join(lines), regressions
+
+
+def _meta(args) -> dict:
+    return {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+            "platform": platform.platform(), "repeat": args.repeat, "max_dates": args.max_dates, "seed": args.seed,
+            "waktu": pd.Timestamp.now().isoformat(timespec="seconds")}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="jumlah baris sheet mapping per skenario (1k s/d 1M)")
+    parser.add_argument("--repeat", type=int, default=3, help="ulangan per tahap, diambil yang tercepat")
+    parser.add_argument("--max-dates", type=int, default=30,
+                        help="jumlah tanggal terakhir yang diputar di tahap playback")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", help="hanya laporkan tahap ini (tahap lain tetap dijalankan sebagai input)")
+    parser.add_argument("--save", help="simpan hasil ke file JSON (bisa dipakai sebagai --baseline nanti)")
+    parser.add_argument("--baseline", help="file JSON hasil --save sebelumnya untuk dibandingkan")
+    parser.add_argument("--threshold", type=float, default=0.2, help="batas perlambatan relatif sebelum dianggap regresi")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat, args.max_dates, args.seed, args.only)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    table, regressions = report(results, baseline, args.threshold)
+    print()
+    print(table)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"meta": _meta(args), "results": results}, f, indent=2)
+    if regressions:
+        print(f"\n{len(regressions)} tahap melambat lebih dari {args.threshold:.0%}:")
+        for name, n, old, new in regressions:
+            print(f"  {name} @ {int(n):,} baris: {old * 1000:.1f} ms -> {new * 1000:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
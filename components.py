@@ -0,0 +1,141 @@
+"""Komponen UI Streamlit yang dipakai bersama oleh beberapa halaman."""
+import os
+
+import pandas as pd
+import streamlit as st
+
+from export import FORMATS, cleanup_exports, export_path, export_range, unique_export_path
+
+
+def export_panel(datasets: dict, key="export"):
+    """
+    Panel ekspor CSV / Parquet untuk rentang tanggal bebas.
+
+    `datasets` = {nama: (DataFrame, kolom_tanggal)}. File baru ditulis (per potongan,
+    lihat export.py) saat tombol "Siapkan file" ditekan, bukan di setiap rerun.
+    """
+    name = st.selectbox("Data", list(datasets), key=f"{key}_data")
+    df, date_col = datasets[name]
+    dates = df[date_col].dropna()
+    if dates.empty:
+        st.info(f"Tidak ada tanggal valid di data {name}.")
+        return
+
+    first, last = dates.min().date(), dates.max().date()
+    date_range = st.date_input(
+        "Rentang tanggal",
+        value=(max(first, last - pd.Timedelta(days=30)), last),
+        min_value=first,
+        max_value=last,
+        key=f"{key}_range",
+    )
+    fmt = st.radio("Format", list(FORMATS), horizontal=True, key=f"{key}_fmt")
+    if len(date_range) != 2:
+        st.caption("Pilih tanggal awal dan akhir.")
+        return
+
+    since, until = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1]) + pd.Timedelta(days=1)
+    state_key = f"{key}_file"
+    if st.button("Siapkan file", key=f"{key}_build"):
+        cleanup_exports()  # file sesi lain yang tidak pernah diunduh
+        _discard_export(state_key)
+        with st.spinner("Menulis file ekspor..."):
+            file_name = os.path.basename(export_path(name, fmt, since, until - pd.Timedelta(days=1)))
+            path = export_range(df, unique_export_path(name, fmt, since, until - pd.Timedelta(days=1)),
+                                fmt, date_col, since, until)
+            st.session_state[state_key] = (path, file_name)
+
+    prepared = st.session_state.get(state_key)
+    if prepared and os.path.exists(prepared[0]):
+        path, file_name = prepared
+        with open(path, "rb") as f:
+            st.download_button(
+                f"Unduh {file_name}", f, file_name=file_name,
+                mime=FORMATS[file_name.rsplit(".", 1)[-1]], key=f"{key}_download",
+                # file sudah diambil: hapus dari disk dan jangan dikirim ulang di rerun berikutnya
+                on_click=_discard_export, args=(state_key,),
+            )
+
+
+def _discard_export(state_key: str):
+    prepared = st.session_state.pop(state_key, None)
+    if prepared:
+        try:
+            os.remove(prepared[0])
+        except OSError:
+            pass
+
+
+def filter_frame(df: pd.DataFrame, date_col=None, since=None, until=None, filters=None) -> pd.DataFrame:
+    """Filter baris di server: `date_col` di [since, until) dan kolom == salah satu nilai terpilih."""
+    mask = pd.Series(True, index=df.index)
+    if date_col is not None and since is not None:
+        mask &= df[date_col] >= pd.Timestamp(since)
+    if date_col is not None and until is not None:
+        mask &= df[date_col] < pd.Timestamp(until)
+    for col, values in (filters or {}).items():
+        if values:
+            mask &= df[col].astype(str).isin([str(v) for v in values])
+    return df[mask]
+
+
+def page_slice(df: pd.DataFrame, page: int, page_size: int, sort_col=None, ascending=False) -> pd.DataFrame:
+    """Satu halaman (mulai 1) setelah diurutkan; yang diurutkan hanya satu kolom, bukan seluruh frame."""
+    if sort_col is not None and sort_col in df.columns:
+        order = df[sort_col].reset_index(drop=True).sort_values(ascending=ascending, kind="stable",
+                                                                 na_position="last").index
+        return df.iloc[order[(page - 1) * page_size: page * page_size]]
+    return df.iloc[(page - 1) * page_size: page * page_size]
+
+
+def paged_table(df: pd.DataFrame, key: str, date_col=None, filter_cols=(), sort_col=None,
+                page_sizes=(25, 50, 100, 250)):
+    """
+    Tabel berhalaman dengan filter rentang tanggal / kolom kategori dan sort di server.
+    Yang dikirim ke browser hanya baris di halaman aktif, jadi berat halaman tetap
+    walaupun sheet terus bertambah.
+    """
+    filter_cols = [c for c in filter_cols if c in df.columns]
+    if date_col not in df.columns:
+        date_col = None
+    sort_col = sort_col if sort_col in df.columns else date_col
+
+    since = until = None
+    filters = {}
+    n_filters = (1 if date_col else 0) + len(filter_cols)
+    if n_filters:
+        cols = st.columns(n_filters)
+        if date_col:
+            dates = df[date_col].dropna()
+            if not dates.empty:
+                first, last = dates.min().date(), dates.max().date()
+                date_range = cols[0].date_input("Rentang tanggal", value=(first, last), min_value=first,
+                                                max_value=last, key=f"{key}_range")
+                if len(date_range) == 2:
+                    since = pd.Timestamp(date_range[0])
+                    until = pd.Timestamp(date_range[1]) + pd.Timedelta(days=1)
+        for col, widget in zip(filter_cols, cols[1 if date_col else 0:]):
+            options = sorted(df[col].dropna().astype(str).unique())
+            filters[col] = widget.multiselect(col, options, key=f"{key}_{col}")
+
+    view = filter_frame(df, date_col, since, until, filters)
+
+    c_sort, c_dir, c_size, c_page = st.columns([3, 2, 2, 2])
+    sort_options = list(df.columns)
+    sort_col = c_sort.selectbox("Urutkan", sort_options,
+                                index=sort_options.index(sort_col) if sort_col in sort_options else 0,
+                                key=f"{key}_sort")
+    ascending = c_dir.radio("Arah", ["Turun", "Naik"], horizontal=True, key=f"{key}_dir") == "Naik"
+    page_size = c_size.selectbox("Baris/halaman", page_sizes, index=1 if len(page_sizes) > 1 else 0,
+                                 key=f"{key}_size")
+    n_pages = max(1, -(-len(view) // page_size))
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = n_pages  # filter mempersempit hasil
+    page = c_page.number_input(f"Halaman (dari {n_pages})", min_value=1, max_value=n_pages, step=1, key=page_key)
+
+    start = (page - 1) * page_size
+    st.dataframe(page_slice(view, page, page_size, sort_col, ascending), use_container_width=True)
+    st.caption(f"Menampilkan {min(start + 1, len(view))}–{min(start + page_size, len(view))} "
+               f"dari {len(view)} baris (total {len(df)})")
+    return view
@@ -0,0 +1,150 @@
+"""Lapisan data bersama: satu koneksi, satu cache, dan frame yang sudah bertipe untuk semua halaman."""
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+from streamlit_gsheets import GSheetsConnection
+
+from ingest import MappingFeed
+from refresher import SheetRefresher, SheetSource
+from schema import GFORM_SCHEMA, MAPPING_SCHEMA, RECLAIMER_SCHEMA, append_rows, empty_frame
+from sheets import SheetCache, normalize_sheet_url
+from yard import YardState
+
+# ===================== S U M B E R   D A T A =====================
+# Mapping/rectangles dan reclaimer ada di spreadsheet yang sama (beda gid)
+SPREADSHEET_URL = normalize_sheet_url("https://docs.google.com/sheets/d/1RNOBQG4m-zpdA2qAf1E1nUAI9QKJMUYGUYwUgIA-jrM/edit?gid=328753631#gid=328753631")
+RECLAIMER_URL = normalize_sheet_url("https://docs.google.com/spreadsheets/d/1RNOBQG4m-zpdA2qAf1E1nUAI9QKJMUYGUYwUgIA-jrM/edit?gid=1231789348#gid=1231789348")
+# Jika tab/worksheet-nya bernama "reclaimer", isi di sini; kalau tidak yakin, biarkan None agar baca sheet sesuai gid
+RECLAIMER_SHEET = None  # atau "reclaimer"
+
+# Jawaban Google Form laporan lapangan
+GFORM_URL = normalize_sheet_url("https://docs.google.com/spreadsheets/d/1mV-POsp6EXiQofywsSr7q8r8nfKw9_SyU8rZ84AUJvI/edit?gid=711561672#gid=711561672")
+
+# Sheet yang dijaga tetap hangat oleh penyegar latar
+SOURCES = {
+    "mapping": SheetSource(SPREADSHEET_URL, schema=MAPPING_SCHEMA),
+    "reclaimer": SheetSource(RECLAIMER_URL, RECLAIMER_SHEET, schema=RECLAIMER_SCHEMA),
+    "gform": SheetSource(GFORM_URL, schema=GFORM_SCHEMA, live_interval=5),
+}
+REFRESH_INTERVAL = 60  # detik
+LIVE_INTERVAL = SOURCES["gform"].live_interval  # detik; jeda rerun fragment live GForm (cek cepat hanya saat ditonton)
+FETCH_TIMEOUT = 20     # detik per sheet; sheet yang lewat batas memakai data terakhir
+
+
+@st.cache_resource
+def get_sheet_cache() -> SheetCache:
+    """Satu koneksi + cache disk untuk semua halaman dan sesi."""
+    conn = st.connection("gsheets", type=GSheetsConnection)
+    # jadwal cek perubahan diatur penyegar (REFRESH_INTERVAL), jadi setiap siklus langsung cek sheet
+    return SheetCache(conn, ttl=0)
+
+
+@st.cache_resource
+def get_refresher() -> SheetRefresher:
+    """Satu thread penyegar untuk semua sesi; rerun pengguna hanya membaca data yang sudah hangat."""
+    # seed: salinan disk terakhir langsung dipakai, unduhan pertama berjalan di latar
+    return SheetRefresher(get_sheet_cache(), SOURCES, interval=REFRESH_INTERVAL,
+                          timeout=FETCH_TIMEOUT).seed().start()
+
+
+@st.cache_resource
+def get_mapping_feed(url: str, rule: str) -> MappingFeed:
+    """
+    State yard bersama lintas rerun & sesi (`.yard`), diisi inkremental dari baris baru
+    sheet mapping + laporan GForm; panggil `.update({"mapping": ..., "gform": ...})`.
+    """
+    return MappingFeed(YardState(rule))
+
+
+class Sheets(dict):
+    """
+    Hasil `load_sheets`: kunci SOURCES -> DataFrame, plus `warm` (kunci -> Warm dari
+    refresher) untuk sheet yang termuat. `version()` dipakai sebagai key cache turunan.
+    """
+
+    def __init__(self, frames: dict, warm: dict):
+        super().__init__(frames)
+        self.warm = warm
+
+    def version(self, *names: str) -> tuple:
+        """Versi data refresher sheet `names` (default semua); -1 untuk sheet yang belum pernah termuat."""
+        return tuple(self.warm[n].version if n in self.warm else -1 for n in (names or self))
+
+
+def load_sheets(*names: str, required=()) -> Sheets:
+    """
+    Data hangat beberapa sheet sekaligus (kunci SOURCES -> DataFrame); sheet yang belum
+    hangat diambil bersamaan. Sheet gagal yang masih punya data lama dipakai dengan
+    peringatan; yang belum pernah termuat jadi frame kosong, kecuali ada di `required`:
+    semua sheet wajib yang gagal ditampilkan sekaligus lalu halaman berhenti.
+    """
+    refresher = get_refresher()
+    warm = refresher.get_many(names)
+    frames, failed = {}, []
+    for name in names:
+        error = refresher.errors.get(name)
+        if name in warm:
+            if error is not None:
+                stamp = datetime.fromtimestamp(warm[name].refreshed_at).strftime("%H:%M:%S")
+                st.warning(f"Sheet {name} gagal diperbarui, memakai data terakhir ({stamp}). Error: {error}")
+            frames[name] = _session_copy(name, warm[name].version, warm[name].df)
+        elif name in required:
+            failed.append(f"URL: {SOURCES[name].url}\nError: {error}")
+        else:
+            st.warning(f"Sheet {name} belum bisa dibaca, ditampilkan kosong. Error: {error}")
+            frames[name] = empty_frame(SOURCES[name].schema)
+    if failed:
+        st.error("Gagal membaca Google Sheet.\n" + "\n".join(failed))
+        st.stop()
+    return Sheets(frames, {name: warm[name] for name in names if name in warm})
+
+
+@st.cache_data(max_entries=len(SOURCES) * 2)
+def _session_copy(name: str, version: int, _df: pd.DataFrame) -> pd.DataFrame:
+    # key = versi data; cache_data mengembalikan salinan, jadi frame bersama tidak ikut terubah halaman
+    return _df
+
+
+def poll_sheet(name: str, key: str) -> tuple:
+    """
+    Versi terbaru sheet `name` untuk tampilan live, disimpan di session_state[`key`].
+    Kalau sheet hanya bertambah baris sejak poll sebelumnya, cuma baris baru yang
+    disambung ke frame sesi; muat ulang penuh hanya kalau baris lama berubah.
+    Kembalikan (frame sesi, baris baru sejak poll sebelumnya). Baris baru None kalau
+    frame sesi baru saja dimuat penuh (poll pertama atau baris lama berubah), frame
+    kosong kalau tidak ada baris baru.
+    """
+    refresher = get_refresher()
+    refresher.watch(name)  # sheet dicek tiap LIVE_INTERVAL hanya selama ada sesi live
+    warm = refresher.get_many([name]).get(name)
+    held = st.session_state.get(key)  # (versi, frame)
+    if warm is None:
+        st.warning(f"Sheet {name} belum bisa dibaca. Error: {refresher.errors.get(name)}")
+        df_ = held[1] if held else empty_frame(SOURCES[name].schema)
+        return df_, df_.iloc[:0]
+    if held is None:
+        df_ = warm.df.copy()
+        new_rows = None
+    elif held[0] == warm.version:
+        return held[1], held[1].iloc[:0]
+    else:
+        new_rows = warm.rows_after(held[0], len(held[1]))
+        df_ = warm.df.copy() if new_rows is None else append_rows(held[1], new_rows)
+    st.session_state[key] = (warm.version, df_)
+    return df_, new_rows
+
+
+def load_mapping() -> pd.DataFrame:
+    """Sheet mapping, tipe kolom sesuai MAPPING_SCHEMA (termasuk kolom segmen "Tiang d1-d2")."""
+    return load_sheets("mapping", required=("mapping",))["mapping"]
+
+
+def load_reclaimer() -> pd.DataFrame:
+    """Sheet posisi reclaimer, tipe kolom sesuai RECLAIMER_SCHEMA; kosong kalau belum bisa dibaca."""
+    return load_sheets("reclaimer")["reclaimer"]
+
+
+def load_gform() -> pd.DataFrame:
+    """Sheet jawaban GForm, tipe kolom sesuai GFORM_SCHEMA."""
+    return load_sheets("gform", required=("gform",))["gform"]
@@ -0,0 +1,112 @@
+"""Ekspor data sheet ke CSV / Parquet per potongan baris (tanpa Streamlit)."""
+import os
+import re
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from sheets import to_arrow_safe
+
+EXPORT_DIR = os.environ.get("STOCKPILE_EXPORT_DIR", ".cache/exports")
+CHUNK_ROWS = 50_000
+FORMATS = {"csv": "text/csv", "parquet": "application/octet-stream"}
+
+
+def iter_chunks(df: pd.DataFrame, date_col="tanggal", since=None, until=None, chunk_rows=CHUNK_ROWS):
+    """Potongan baris `df` dengan `date_col` di [since, until), tanpa menyalin seluruh hasil filter sekaligus."""
+    mask = pd.Series(True, index=df.index)
+    if since is not None:
+        mask &= df[date_col] >= pd.Timestamp(since)
+    if until is not None:
+        mask &= df[date_col] < pd.Timestamp(until)
+    positions = mask.to_numpy().nonzero()[0]
+    for i in range(0, len(positions), chunk_rows):
+        yield df.iloc[positions[i:i + chunk_rows]]
+
+
+def _write_csv(chunks, path, columns):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        written = False
+        for chunk in chunks:
+            chunk.to_csv(f, index=False, header=not written)
+            written = True
+        if not written:  # rentang kosong: tetap tulis header kolom
+            pd.DataFrame(columns=columns).to_csv(f, index=False)
+
+
+def _arrow_schema(df: pd.DataFrame) -> pa.Schema:
+    # skema dari dtype seluruh frame, bukan potongan pertama: kolom teks yang kosong
+    # di potongan awal (tipe null) tetap string supaya potongan berikutnya bisa ditulis
+    schema = pa.Schema.from_pandas(to_arrow_safe(df.iloc[:0]), preserve_index=False)
+    return pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in schema])
+
+
+def _write_parquet(chunks, path, df):
+    schema = _arrow_schema(df)
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(to_arrow_safe(chunk), schema=schema, preserve_index=False))
+
+
+def export_path(name: str, fmt: str, since=None, until=None, export_dir=EXPORT_DIR) -> str:
+    """Nama file ekspor yang bisa dibaca manusia, mis. `mapping_2024-01-01_2024-02-01.csv`."""
+    slug = re.sub(r"[^0-9A-Za-z_-]+", "_", name).strip("_").lower() or "data"
+    parts = [slug] + [pd.Timestamp(d).strftime("%Y-%m-%d") for d in (since, until) if d is not None]
+    return os.path.join(export_dir, "_".join(parts) + f".{fmt}")
+
+
+def unique_export_path(name: str, fmt: str, since=None, until=None, export_dir=EXPORT_DIR) -> str:
+    """Seperti `export_path`, tapi unik per pemanggilan (sesi lain tidak menimpa file yang sama)."""
+    os.makedirs(export_dir, exist_ok=True)
+    readable = os.path.basename(export_path(name, fmt, since, until, export_dir))
+    fd, path = tempfile.mkstemp(dir=export_dir, prefix="x", suffix=f"-{readable}")
+    os.close(fd)
+    return path
+
+
+def cleanup_exports(max_age=3600, export_dir=EXPORT_DIR) -> int:
+    """Hapus file ekspor yang lebih tua dari `max_age` detik (tidak pernah diunduh). Kembalikan jumlahnya."""
+    removed = 0
+    try:
+        entries = list(os.scandir(export_dir))
+    except OSError:
+        return 0
+    cutoff = time.time() - max_age
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            pass  # sudah dihapus sesi lain
+    return removed
+
+
+def export_range(df: pd.DataFrame, path: str, fmt="csv", date_col="tanggal", since=None, until=None,
+                 chunk_rows=CHUNK_ROWS) -> str:
+    """
+    Tulis baris `df` dengan `date_col` di [since, until) ke `path` sebagai CSV atau Parquet.
+    Ditulis per `chunk_rows` baris ke file sementara (nama unik, aman untuk beberapa sesi
+    sekaligus) lalu di-rename, jadi memori puncak sebesar satu potongan, bukan seluruh file hasil.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Format ekspor tidak dikenal: {fmt!r}")
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as tmp:
+        tmp_path = tmp.name
+    try:
+        chunks = iter_chunks(df, date_col, since, until, chunk_rows)
+        if fmt == "csv":
+            _write_csv(chunks, tmp_path, list(df.columns))
+        else:
+            _write_parquet(chunks, tmp_path, df)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
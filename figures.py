@@ -0,0 +1,269 @@
+"""Pembangun figure Plotly untuk peta pile (tanpa Streamlit)."""
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from segments import SegmentMatrix
+
+# mapping warna berdasarkan tipe
+COLOR_MAP = {
+    "Coal Normal": "green",
+    "Coal Mix 2:1": "yellow",
+    "Coal Mix 1:2 (HS:NS)": "yellow",
+    "Coal HS": "red",
+    "Coal NS": "green",
+}
+
+# Kolom customdata: 0 tipe, 1 tongkang, 2-3 tiang, 4-5 sudut, 6 tanggal, 7 ash, 8 sulfur
+PILE_HOVER = (
+    "<b>Tipe:</b> %{customdata[0]}<br><b>Tongkang:</b> %{customdata[1]}<br>"
+    "<b>Tiang:</b> %{customdata[2]} → %{customdata[3]}<br>"
+    "<b>Sudut:</b> %{customdata[4]:.1f} → %{customdata[5]:.1f}<br>"
+    "<b>Tanggal:</b> %{customdata[6]}<extra></extra>"
+)
+PILE_HOVER_QUALITY = (
+    "<b>Tipe:</b> %{customdata[0]}<br><b>Tongkang:</b> %{customdata[1]}<br>"
+    "<b>Ash:</b> %{customdata[7]}<br><b>Sulfur:</b> %{customdata[8]}<br>"
+    "<b>Tanggal:</b> %{customdata[6]}<extra></extra>"
+)
+
+
+def _text(values: pd.Series) -> pd.Series:
+    # nilai kosong ditampilkan sebagai '-'
+    return values.astype(str).where(values.notna(), "-")
+
+
+def pile_customdata(piles: pd.DataFrame) -> np.ndarray:
+    """Data hover semua pile sebagai satu array (baris = pile)."""
+    def _col(name):
+        return piles[name] if name in piles.columns else pd.Series(np.nan, index=piles.index)
+
+    tiang = [np.trunc(piles[c].astype(float)).astype("Int64") for c in ("tiang_start", "tiang_end")]
+    return np.column_stack([
+        _text(piles["tipe"]),
+        _text(_col("tongkang")),
+        _text(tiang[0]),
+        _text(tiang[1]),
+        piles["sudut_start"].astype(float),
+        piles["sudut_end"].astype(float),
+        _text(piles["tanggal"].dt.strftime("%Y-%m-%d")),
+        _text(_col("Ash_%")),
+        _text(_col("Sulfur_%")),
+    ]).astype(object)
+
+
+def pile_layers(piles: pd.DataFrame, color_map=COLOR_MAP, label_style=None):
+    """Kotak + label untuk semua pile sebagai list dict (tanpa validasi Plotly per elemen)."""
+    x0 = piles["tiang_start"].to_numpy(dtype=float)
+    x1 = piles["tiang_end"].to_numpy(dtype=float)
+    y0 = piles["sudut_start"].to_numpy(dtype=float)
+    y1 = piles["sudut_end"].to_numpy(dtype=float)
+    tipe = piles["tipe"].astype(str).str.strip()
+    colors = tipe.map(color_map).fillna("lightgrey")
+    label_style = label_style or {}
+
+    shapes, annotations = [], []
+    for a, b, c, d, t, color in zip(x0.tolist(), x1.tolist(), y0.tolist(), y1.tolist(), tipe.tolist(), colors.tolist()):
+        shapes.append(dict(type="rect", x0=a, y0=c, x1=b, y1=d,
+                           line=dict(color=color, width=3), fillcolor=color, opacity=0.5))
+        annotations.append(dict(x=(a + b) / 2, y=(c + d) / 2, text=t, showarrow=False,
+                                font=dict(size=15, color="black"), **label_style))
+    return shapes, annotations
+
+
+def pile_hover_trace(piles: pd.DataFrame, hovertemplate=PILE_HOVER, marker_size=30) -> go.Scatter:
+    """Satu trace marker transparan di tengah setiap pile, info hover lewat customdata."""
+    return go.Scatter(
+        x=(piles["tiang_start"].to_numpy(dtype=float) + piles["tiang_end"].to_numpy(dtype=float)) / 2,
+        y=(piles["sudut_start"].to_numpy(dtype=float) + piles["sudut_end"].to_numpy(dtype=float)) / 2,
+        mode="markers",
+        marker=dict(size=marker_size, opacity=0),
+        customdata=pile_customdata(piles),
+        hovertemplate=hovertemplate,
+        showlegend=False,
+    )
+
+
+def pile_fill_traces(piles: pd.DataFrame, color_map=COLOR_MAP, colors=None) -> list:
+    """
+    Semua kotak dengan warna yang sama digambar sebagai satu `go.Scatter(fill="toself")`,
+    poligon antar pile dipisah NaN. Browser cukup menggambar satu trace per warna.
+
+    Kalau `colors` diisi, hasilnya tepat satu trace per warna tersebut (boleh kosong),
+    supaya susunan trace sama di setiap frame animasi.
+    """
+    x0 = piles["tiang_start"].to_numpy(dtype=float)
+    x1 = piles["tiang_end"].to_numpy(dtype=float)
+    y0 = piles["sudut_start"].to_numpy(dtype=float)
+    y1 = piles["sudut_end"].to_numpy(dtype=float)
+    gap = np.full_like(x0, np.nan)
+    xs = np.column_stack([x0, x1, x1, x0, x0, gap])
+    ys = np.column_stack([y0, y0, y1, y1, y0, gap])
+
+    tipe = piles["tipe"].astype(str).str.strip()
+    pile_colors = tipe.map(color_map).fillna("lightgrey").to_numpy()
+    traces = []
+    for color in (pd.unique(pile_colors) if colors is None else colors):
+        mask = pile_colors == color
+        traces.append(go.Scatter(
+            x=xs[mask].ravel(), y=ys[mask].ravel(),
+            mode="lines", fill="toself", fillcolor=color, opacity=0.5,
+            line=dict(color=color, width=3),
+            name=", ".join(sorted(set(tipe[mask]))),
+            hoverinfo="skip",
+            showlegend=False,  # sama seperti mode shapes: warna dijelaskan label tipe, bukan legenda
+        ))
+    return traces
+
+
+def pile_label_trace(piles: pd.DataFrame) -> go.Scatter:
+    """Label tipe semua pile dalam satu trace teks."""
+    return go.Scatter(
+        x=(piles["tiang_start"].to_numpy(dtype=float) + piles["tiang_end"].to_numpy(dtype=float)) / 2,
+        y=(piles["sudut_start"].to_numpy(dtype=float) + piles["sudut_end"].to_numpy(dtype=float)) / 2,
+        mode="text",
+        text=piles["tipe"].astype(str).str.strip(),
+        textfont=dict(size=15, color="black"),
+        hoverinfo="skip",
+        showlegend=False,
+    )
+
+
+def build_pile_figure(piles: pd.DataFrame, color_map=COLOR_MAP, hovertemplate=PILE_HOVER,
+                      marker_size=30, label_style=None, render="shapes") -> go.Figure:
+    """
+    Figure peta pile, hover semua pile dalam satu trace.
+
+    render="shapes" : kotak & label sebagai layout shapes/annotations (satu `update_layout`).
+    render="traces" : kotak sebagai satu trace terisi per warna + satu trace label,
+                      lebih ringan untuk browser/tablet kalau pile banyak.
+    """
+    fig = go.Figure()
+    if piles.empty:
+        return fig
+    if render == "traces":
+        fig.add_traces(pile_fill_traces(piles, color_map) + [pile_label_trace(piles)])
+    else:
+        shapes, annotations = pile_layers(piles, color_map, label_style)
+        fig.update_layout(shapes=shapes, annotations=annotations)
+    fig.add_trace(pile_hover_trace(piles, hovertemplate, marker_size))
+    return fig
+
+
+def reclaimer_traces(reclaimer: pd.Series | None) -> list:
+    """Kotak reclaimer (garis putus-putus) + titik boom sebagai dua trace; kosong kalau tidak ada."""
+    x_box, y_box, x_boom, y_boom, text = [], [], [], [], []
+    if reclaimer is not None:
+        x0r, x1r = float(reclaimer["tiang_awal"]), float(reclaimer["tiang_ahir"])
+        x_box, y_box = [x0r, x1r, x1r, x0r, x0r], [0, 0, 90, 90, 0]
+        if "ketinggian_boom" in reclaimer and pd.notna(reclaimer["ketinggian_boom"]):
+            x_boom, y_boom = [(x0r + x1r) / 2], [float(reclaimer["ketinggian_boom"])]
+            text = [f"Boom {reclaimer['ketinggian_boom']:.1f}"]
+    return [
+        go.Scatter(x=x_box, y=y_box, mode="lines", line=dict(color="grey", width=4, dash="dash"),
+                   name="Reclaimer", hoverinfo="skip", showlegend=False),
+        go.Scatter(x=x_boom, y=y_boom, mode="markers+text", marker=dict(size=10, color="red", symbol="circle"),
+                   text=text, textposition="top center", hoverinfo="skip", showlegend=False),
+    ]
+
+
+def build_playback_figure(frames, color_map=COLOR_MAP, hovertemplate=PILE_HOVER, marker_size=30,
+                          duration=600) -> go.Figure:
+    """
+    Animasi kondisi yard dari daftar `(label, piles, reclaimer)`, urut waktu.
+
+    Semua frame dihitung di server sekali lalu dikirim sebagai `go.Frame`; tombol
+    putar dan slider berjalan di browser tanpa rerun. Susunan trace tiap frame
+    tetap: satu trace terisi per warna, label, hover pile, kotak reclaimer, boom.
+    """
+    colors = list(pd.unique(pd.Series(list(color_map.values()) + ["lightgrey"])))
+    go_frames = []
+    for label, piles, reclaimer in frames:
+        data = pile_fill_traces(piles, color_map, colors)
+        data += [pile_label_trace(piles), pile_hover_trace(piles, hovertemplate, marker_size)]
+        data += reclaimer_traces(reclaimer)
+        go_frames.append(go.Frame(data=data, name=label, layout=dict(title=f"Kondisi Yard per {label}")))
+
+    fig = go.Figure(frames=go_frames)
+    if not go_frames:
+        return fig
+    fig.add_traces(go_frames[0].data)
+
+    step_args = dict(mode="immediate", frame=dict(duration=duration, redraw=True), transition=dict(duration=0))
+    fig.update_layout(
+        title=go_frames[0].layout.title,
+        updatemenus=[dict(
+            type="buttons", direction="left", x=0, y=-0.08, xanchor="left", yanchor="top",
+            buttons=[
+                dict(label="▶ Putar", method="animate", args=[None, dict(step_args, fromcurrent=True)]),
+                dict(label="⏸ Jeda", method="animate",
+                     args=[[None], dict(mode="immediate", frame=dict(duration=0, redraw=False))]),
+            ],
+        )],
+        sliders=[dict(
+            x=0.15, y=-0.08, len=0.85, yanchor="top", currentvalue=dict(prefix="Tanggal: "),
+            steps=[dict(label=f.name, method="animate", args=[[f.name], step_args]) for f in go_frames],
+        )],
+    )
+    return fig
+
+
+def build_surface_figure(seg: SegmentMatrix, title="3D Surface – Profil Tiang") -> go.Figure:
+    """Surface 3D tanggal × segmen; sumbu X diberi nama kolom tiang, sumbu Y label tanggal yang diringkas."""
+    x_numeric = np.arange(len(seg.labels))
+    tick_y_idx, tick_y_text = seg.date_ticks()
+    fig = go.Figure(data=[
+        go.Surface(z=seg.z, x=x_numeric, y=np.arange(len(seg.tanggal)), showscale=True, colorbar=dict(title="Nilai"))
+    ])
+    fig.update_layout(
+        title=title,
+        scene=dict(
+            xaxis_title="Segmen Tiang",
+            yaxis_title="Tanggal",
+            zaxis_title="Nilai",
+            # Tampilkan nama kolom tiang di sumbu X, tanggal di sumbu Y
+            xaxis=dict(tickmode="array", tickvals=x_numeric, ticktext=seg.labels),
+            yaxis=dict(tickmode="array", tickvals=tick_y_idx, ticktext=tick_y_text),
+        ),
+        margin=dict(l=0, r=0, t=50, b=0),
+        height=750,
+    )
+    return fig
+
+
+class FigureCache:
+    """
+    Cache figure yang sudah dibangun, key = versi data + input yang memang mengubah isi figure.
+
+    Input yang hanya menggeser tampilan (rentang sumbu dari slider) tidak masuk key;
+    terapkan lewat `patch_axes` setelah `get`. Figure yang dikembalikan ikut di-patch,
+    jadi satu cache sebaiknya dipakai satu sesi saja (simpan di `st.session_state`).
+    """
+
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self._figs = OrderedDict()
+
+    def get(self, name: str, key, build) -> go.Figure:
+        """Figure `name` untuk `key`; `build()` hanya dipanggil kalau belum ada di cache."""
+        k = (name, key)
+        fig = self._figs.get(k)
+        if fig is None:
+            fig = build()
+            self._figs[k] = fig
+            while len(self._figs) > self.max_entries:
+                self._figs.popitem(last=False)
+        else:
+            self._figs.move_to_end(k)
+        return fig
+
+
+def patch_axes(fig: go.Figure, x_range=None, y_range=None) -> go.Figure:
+    """Ganti rentang sumbu x/y saja (patch layout murah, trace & shape tidak disentuh)."""
+    if x_range is not None:
+        fig.layout.xaxis.range = list(x_range)
+    if y_range is not None:
+        fig.layout.yaxis.range = list(y_range)
+    return fig
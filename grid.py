@@ -0,0 +1,115 @@
+"""Raster okupansi yard: nomor tiang × bin sudut (tanpa Streamlit)."""
+import numpy as np
+import pandas as pd
+
+EMPTY = -1  # sel tanpa pile
+
+
+class OccupancyGrid:
+    """
+    Raster okupansi dari pile terpilih (hasil `YardState.resolve` / snapshot).
+
+    Baris = nomor tiang (rentang pile inklusif, dipotong ke bawah seperti `int()`),
+    kolom = bin sudut selebar `sudut_step` derajat; bin terisi kalau titik tengahnya
+    ada di [sudut_start, sudut_end). Tiap sel menyimpan id pile (posisi baris di
+    `self.piles`), kode tipe (indeks ke `self.tipes`) dan tanggal. Pile dilukis dari
+    yang terlama, jadi kalau ada yang tumpang tindih sel berisi pile terbaru.
+    """
+
+    def __init__(self, piles: pd.DataFrame, sudut_step=1.0, sudut_range=(0.0, 90.0)):
+        valid = piles[["tiang_start", "tiang_end", "sudut_start", "sudut_end"]].notna().all(axis=1).to_numpy()
+        self.piles = piles if valid.all() else piles[valid]
+        self.sudut_step = float(sudut_step)
+        tipe = self.piles["tipe"].astype("category")
+        self.tipes = list(tipe.cat.categories)
+        codes = tipe.cat.codes.to_numpy(dtype=np.int16)
+        times = self.piles["tanggal"].to_numpy(dtype="datetime64[ns]")
+
+        t0 = np.trunc(self.piles["tiang_start"].to_numpy(dtype=float)).astype(np.int64)
+        t1 = np.trunc(self.piles["tiang_end"].to_numpy(dtype=float)).astype(np.int64)
+        ss = self.piles["sudut_start"].to_numpy(dtype=float)
+        se = self.piles["sudut_end"].to_numpy(dtype=float)
+
+        self.tiang0 = int(t0.min()) if len(t0) else 0
+        n_tiang = int(t1.max()) - self.tiang0 + 1 if len(t1) else 0
+        self.sudut0 = float(np.floor(min([sudut_range[0], *ss.tolist()])))
+        sudut_max = float(np.ceil(max([sudut_range[1], *se.tolist()])))
+        n_bins = int(np.ceil((sudut_max - self.sudut0) / self.sudut_step))
+
+        self.pile_id = np.full((max(n_tiang, 0), n_bins), EMPTY, dtype=np.int32)
+        self.tipe_code = np.full(self.pile_id.shape, EMPTY, dtype=np.int16)
+        self.tanggal = np.full(self.pile_id.shape, np.datetime64("NaT"), dtype="datetime64[ns]")
+
+        # bin j terisi kalau sudut0 + (j + 0.5) * step ada di [ss, se)
+        c0 = np.ceil((ss - self.sudut0) / self.sudut_step - 0.5).astype(np.int64)
+        c1 = np.ceil((se - self.sudut0) / self.sudut_step - 0.5).astype(np.int64)
+        r0, r1 = t0 - self.tiang0, t1 - self.tiang0
+
+        # urutan lukis: terlama dulu (tanggal kosong paling lama), tanggal kembar ikut urutan baris
+        self.order = np.argsort(times.view("int64"), kind="stable")
+        self.rank = np.empty(len(self.order), dtype=np.int64)
+        self.rank[self.order] = np.arange(len(self.order))
+        for i in self.order.tolist():
+            rows, cols = slice(r0[i], r1[i] + 1), slice(max(c0[i], 0), max(c1[i], 0))
+            self.pile_id[rows, cols] = i
+            self.tipe_code[rows, cols] = codes[i]
+            self.tanggal[rows, cols] = times[i]
+
+    @property
+    def shape(self):
+        return self.pile_id.shape
+
+    def _rows(self, tiang):
+        rows = np.trunc(np.asarray(tiang, dtype=float)).astype(np.int64) - self.tiang0
+        return rows, (rows >= 0) & (rows < self.shape[0])
+
+    def _cols(self, sudut):
+        cols = np.floor((np.asarray(sudut, dtype=float) - self.sudut0) / self.sudut_step).astype(np.int64)
+        return cols, (cols >= 0) & (cols < self.shape[1])
+
+    def _select(self, ids) -> pd.DataFrame:
+        ids = np.asarray(ids)
+        return self.piles.iloc[ids[ids != EMPTY]]
+
+    def at(self, tiang, sudut) -> np.ndarray:
+        """Id pile di titik (tiang, sudut), vektor; `EMPTY` kalau kosong / di luar grid."""
+        rows, ok_r = self._rows(tiang)
+        cols, ok_c = self._cols(sudut)
+        rows, cols, ok = np.broadcast_arrays(rows, cols, ok_r & ok_c)
+        out = np.full(rows.shape, EMPTY, dtype=np.int32)
+        out[ok] = self.pile_id[rows[ok], cols[ok]]
+        return out
+
+    def piles_at(self, tiang, sudut) -> pd.DataFrame:
+        """Baris pile di titik-titik (tiang, sudut) yang terisi."""
+        return self._select(np.atleast_1d(self.at(tiang, sudut)))
+
+    def region(self, tiang_lo, tiang_hi, sudut_lo=None, sudut_hi=None) -> pd.DataFrame:
+        """Pile yang menempati tiang [tiang_lo, tiang_hi] (inklusif) × sudut [sudut_lo, sudut_hi)."""
+        r0 = max(int(np.trunc(tiang_lo)) - self.tiang0, 0)
+        r1 = min(int(np.trunc(tiang_hi)) - self.tiang0 + 1, self.shape[0])
+        c0 = 0 if sudut_lo is None else max(int(np.floor((sudut_lo - self.sudut0) / self.sudut_step)), 0)
+        c1 = self.shape[1] if sudut_hi is None else min(int(np.ceil((sudut_hi - self.sudut0) / self.sudut_step)), self.shape[1])
+        if r1 <= r0 or c1 <= c0:
+            return self.piles.iloc[[]]
+        ids = np.unique(self.pile_id[r0:r1, c0:c1])
+        return self._select(ids)
+
+    def column(self, tiang) -> np.ndarray:
+        """Id pile terbaru di setiap nomor tiang dalam `tiang` (semua sudut); `EMPTY` kalau kosong."""
+        rows, ok = self._rows(np.atleast_1d(tiang))
+        out = np.full(rows.shape, EMPTY, dtype=np.int32)
+        if not ok.any() or not self.shape[1]:
+            return out
+        ids = self.pile_id[rows[ok]]
+        ranks = np.where(ids != EMPTY, self.rank[np.maximum(ids, 0)], -1).max(axis=1)
+        out[ok] = np.where(ranks >= 0, self.order[np.maximum(ranks, 0)], EMPTY)
+        return out
+
+    def column_tipe(self, tiang) -> pd.Series:
+        """Tipe pile terbaru di setiap nomor tiang; NaN kalau tidak ada pile."""
+        ids = self.column(tiang)
+        out = pd.Series(np.nan, index=np.arange(len(ids)), dtype=object)
+        found = ids != EMPTY
+        out[found] = self.piles["tipe"].to_numpy(dtype=object)[ids[found]]
+        return out
@@ -0,0 +1,121 @@
+"""Laporan lapangan GForm -> baris skema mapping, dialirkan inkremental ke YardState (tanpa Streamlit)."""
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from schema import append_rows, parse_numbers
+from yard import YardState
+
+# Kolom GForm -> kolom sheet mapping (nilai disalin apa adanya)
+GFORM_TO_MAPPING = {
+    "Timestamp": "tanggal",
+    "Tipe Coal": "tipe",
+    "Nama Tongkang": "tongkang",
+    "Tiang Awal": "tiang_start",
+    "Tiang Akhir": "tiang_end",
+    "Sudut Stacking": "Sudut Stacking",
+    "Ketinggian pile": "ketinggian",
+}
+SUDUT_WIDTH = 10.0  # lebar pile (derajat) kalau laporan hanya berisi satu sudut
+
+_RANGE_SPLIT = re.compile(r"\s*(?:-|–|s/d|sd|sampai)\s*", re.IGNORECASE)
+
+
+def parse_sudut(values: pd.Series, width=SUDUT_WIDTH) -> tuple:
+    """
+    "Sudut Stacking" -> (sudut_start, sudut_end) float32. Rentang "30-45" / "30 s/d 45"
+    dipakai apa adanya (diurutkan); satu angka "40" jadi pile selebar `width` derajat
+    yang berpusat di sudut tersebut. Koma desimal diterima, teks lain jadi NaN.
+    """
+    parts = values.astype("string").str.strip().str.split(_RANGE_SPLIT, n=1, expand=True, regex=True)
+    lo = parse_numbers(parts[0]).to_numpy(dtype=float)
+    hi = parse_numbers(parts[1]).to_numpy(dtype=float) if parts.shape[1] > 1 else np.full(len(lo), np.nan)
+    single = np.isnan(hi)
+    start = np.where(single, lo - width / 2, np.fmin(lo, hi))
+    end = np.where(single, lo + width / 2, np.fmax(lo, hi))
+    return start.astype(np.float32), end.astype(np.float32)
+
+
+def gform_to_mapping(df_gform: pd.DataFrame, sudut_width=SUDUT_WIDTH) -> pd.DataFrame:
+    """
+    Normalisasi laporan GForm (sudah bertipe GFORM_SCHEMA) ke kolom sheet mapping.
+    Hanya laporan dengan "Ada Stacking?" = Ya (kalau kolomnya ada) dan posisi tiang,
+    sudut, tipe serta tanggal lengkap yang dipakai. Index baris GForm dipertahankan.
+    """
+    rows = df_gform
+    if "Ada Stacking?" in rows.columns:
+        answer = rows["Ada Stacking?"].astype("string").str.strip().str.lower()
+        rows = rows[answer.str.startswith("y").fillna(False).to_numpy(dtype=bool)]
+    out = pd.DataFrame({dst: rows[src] for src, dst in GFORM_TO_MAPPING.items() if src in rows.columns},
+                       index=rows.index)
+    if "Sudut Stacking" in rows.columns:
+        out["sudut_start"], out["sudut_end"] = parse_sudut(rows["Sudut Stacking"], sudut_width)
+    out["sumber"] = "gform"
+    need = ["tanggal", "tipe", "tiang_start", "tiang_end", "sudut_start", "sudut_end"]
+    if any(c not in out.columns for c in need):
+        return out.iloc[:0]
+    return out.dropna(subset=need)
+
+
+class MappingFeed:
+    """
+    Aliran baris mapping gabungan (sheet mapping + laporan GForm) untuk satu YardState.
+
+    `update` menerima data hangat refresher (`Warm`) per sumber. Selama refresher
+    menyatakan sheet hanya bertambah baris sejak versi yang sudah dialirkan
+    (`Warm.rows_after`), hanya baris baru yang dinormalisasi lalu disambung ke `frame`
+    dalam urutan datang, jadi YardState tetap hanya memproses baris baru. Kalau satu
+    sumber berubah di luar itu (baris lama diedit / dihapus), aliran dan YardState
+    dibangun ulang dari awal. Sumber yang belum pernah termuat dilewati, bukan
+    dianggap kosong, supaya kegagalan baca tidak mengosongkan yard.
+    """
+
+    # sumber -> fungsi normalisasi ke skema mapping
+    SOURCES = {
+        "mapping": None,
+        "gform": gform_to_mapping,
+    }
+
+    def __init__(self, yard_state: YardState):
+        self.yard = yard_state
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.frame = None   # baris gabungan yang sudah dialirkan ke YardState
+        self._seen = {}     # sumber -> (versi Warm, jumlah baris) yang sudah dialirkan
+
+    def _new_rows(self, name, warm) -> pd.DataFrame | None:
+        """Baris `warm` yang belum dialirkan; None kalau sumber harus dimuat ulang penuh."""
+        seen = self._seen.get(name)
+        if seen is None:
+            return warm.df
+        if seen[0] == warm.version:
+            return warm.df.iloc[:0]
+        return warm.rows_after(*seen)
+
+    def update(self, warm: dict) -> int:
+        """Alirkan baris baru dari `warm` (nama sumber -> Warm; kunci lain diabaikan). Mengembalikan jumlah baris baru."""
+        with self._lock:
+            sources = {name: warm[name] for name in self.SOURCES if name in warm}
+            new = {name: self._new_rows(name, w) for name, w in sources.items()}
+            if any(rows is None for rows in new.values()):
+                self._reset()
+                self.yard.reset()
+                new = {name: w.df for name, w in sources.items()}
+            batches = []
+            for name, rows in new.items():
+                self._seen[name] = (sources[name].version, len(sources[name].df))
+                if rows.empty:
+                    continue
+                normalize = self.SOURCES[name]
+                batch = rows if normalize is None else normalize(rows)
+                if not batch.empty:
+                    batches.append(batch.assign(sumber=name))
+            if not batches:
+                return 0
+            for batch in batches:
+                self.frame = batch if self.frame is None else append_rows(self.frame, batch)
+            return self.yard.update(self.frame)
@@ -1,38 +1,53 @@
 import streamlit as st
-from streamlit_gsheets import GSheetsConnection
 import plotly.graph_objects as go
 import plotly.colors as pc
 import pandas as pd
 
+from components import export_panel, paged_table
+from data import LIVE_INTERVAL, load_gform, poll_sheet
+
 # --- Konfigurasi Halaman Streamlit ---
 st.set_page_config(page_title="Rectangles from Google Sheet", layout="wide")
 
-# ===================== S U M B E R   D A T A =====================
-# URL 1 (lama) untuk mapping/rectangles
-GFORM_URL = "https://docs.google.com/spreadsheets/d/1mV-POsp6EXiQofywsSr7q8r8nfKw9_SyU8rZ84AUJvI/edit?gid=711561672#gid=711561672"
-
-# --- Koneksi ke Google Sheets ---
-conn = st.connection("gsheets", type=GSheetsConnection)
-
-@st.cache_data(ttl=60)
-def read_sheet(url: str, worksheet: str | None = None) -> pd.DataFrame:
-    """Helper baca sheet dgn fallback."""
-    try:
-        if worksheet:
-            df_ = conn.read(spreadsheet=url, worksheet=worksheet, ttl=5)
-        else:
-            df_ = conn.read(spreadsheet=url, ttl=5)
-    except Exception as e:
-        st.error(f"Gagal membaca Google Sheet.\nURL: {url}\nError: {e}")
-        st.stop()
-    df_.columns = [str(c).strip() for c in df_.columns]
-    return df_
-# ===================== B A C A   D A T A   U T A M A =====================
-df = read_sheet(GFORM_URL)
-
-st.subheader("Data Dari GForm")
 kolom_tampil = ["Timestamp", "Grup", "Tiang Awal", "Tiang Akhir", "Nama Tongkang", "Ada Stacking?", "Tipe Coal", "Sudut Stacking", "Ketinggian Stacking", "Ketinggian pile"]
-st.dataframe(
-    df[[c for c in kolom_tampil if c in df.columns]],
-    use_container_width=True
+
+live = st.sidebar.toggle(
+    "Live update",
+    value=False,
+    help=f"Cek laporan baru tiap {LIVE_INTERVAL} detik; hanya tabel ini yang diperbarui, bukan seluruh halaman."
 )
+
+
+def show_gform(df: pd.DataFrame):
+    st.subheader("Data Dari GForm")
+    paged_table(
+        df[[c for c in kolom_tampil if c in df.columns]],
+        key="gform", date_col="Timestamp", filter_cols=["Grup", "Nama Tongkang", "Tipe Coal"],
+    )
+
+
+# ===================== B A C A   D A T A   U T A M A =====================
+if live:
+    @st.fragment(run_every=LIVE_INTERVAL)
+    def live_gform():
+        """Rerun sendiri tiap LIVE_INTERVAL detik; baris baru disambung ke frame sesi, bukan memuat ulang semuanya."""
+        df_live, new_rows = poll_sheet("gform", "gform_live")
+        if new_rows is None:
+            st.session_state.pop("gform_new", None)  # dimuat penuh: daftar "terbaru" lama tidak berlaku lagi
+        elif len(new_rows):
+            st.toast(f"{len(new_rows)} laporan GForm baru masuk")
+            st.session_state["gform_new"] = new_rows
+        new = st.session_state.get("gform_new")
+        if new is not None and len(new):
+            st.caption(f"Laporan terbaru ({len(new)} baris), dicek tiap {LIVE_INTERVAL} detik")
+            st.dataframe(new[[c for c in kolom_tampil if c in new.columns]], use_container_width=True)
+        show_gform(df_live)
+
+    live_gform()
+    df = st.session_state["gform_live"][1] if "gform_live" in st.session_state else load_gform()
+else:
+    df = load_gform()
+    show_gform(df)
+
+with st.expander("Ekspor data GForm (CSV / Parquet)"):
+    export_panel({"GForm": (df, "Timestamp")}, key="gform_export")
@@ -0,0 +1,229 @@
+"""Penyegar data sheet di latar belakang, dipakai bersama semua sesi (tanpa Streamlit)."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from schema import append_rows, apply_schema
+
+
+@dataclass(frozen=True)
+class SheetSource:
+    """Satu sheet yang dijaga tetap hangat: alamat + skema kolomnya."""
+    url: str
+    worksheet: str | None = None
+    schema: dict | None = None
+    live_interval: float | None = None  # jeda refresh selama ada tampilan live (lihat `watch`)
+
+
+@dataclass(frozen=True)
+class Warm:
+    """
+    Data siap pakai satu sheet. `version` naik hanya kalau isinya berubah. Sejak versi
+    `append_base` sheet hanya bertambah baris di bawah, jadi frame versi mana pun di
+    rentang itu adalah awalan dari `df` (lihat `rows_after`).
+    """
+    version: int
+    df: pd.DataFrame
+    refreshed_at: float
+    append_base: int = 0
+    columns: tuple = field(default=(), repr=False, compare=False)                 # header mentah
+    row_hash: np.ndarray = field(default=None, repr=False, compare=False)        # hash baris mentah
+
+    def rows_after(self, version: int, rows: int) -> pd.DataFrame | None:
+        """Baris baru sejak frame (`version`, `rows` baris) yang sudah dipegang; None kalau harus muat ulang penuh."""
+        if not self.append_base <= version <= self.version or rows > len(self.df):
+            return None
+        return self.df.iloc[rows:]
+
+
+class SheetRefresher:
+    """
+    Ambil + parse sheet secara berkala di thread latar, lalu tukar hasilnya sekaligus.
+
+    Rerun pengguna cukup memanggil `get(name)` dan selalu membaca data yang sudah
+    hangat; biaya round trip Google Sheets + `apply_schema` dibayar thread ini, bukan
+    rerun pertama setelah cache kedaluwarsa. Semua sheet satu siklus dipasang dengan
+    satu assignment dict, jadi pembaca tidak pernah melihat campuran versi lama/baru.
+
+    Semua sheet satu siklus diambil bersamaan (satu thread per sheet), masing-masing
+    dibatasi `timeout` detik. Sheet yang gagal / lewat batas waktu dicatat di `errors`
+    dan data lamanya tetap dipakai; sheet lain tetap diperbarui. Fetch yang lewat batas
+    waktu tidak dibatalkan: hasilnya dipakai di siklus berikutnya kalau sudah selesai,
+    dan sheet itu tidak diambil dobel selama fetch tersebut masih jalan.
+
+    Sheet dengan `SheetSource.live_interval` dicek secepat itu hanya selama ada tampilan
+    live yang memanggil `watch(name)`; tanpa penonton kembali ke jeda `interval`.
+
+    `cache` cukup objek dengan method `read(url, worksheet)` (mis. `SheetCache` dengan
+    koneksi palsu), jadi bisa dijalankan lokal tanpa jaringan. Kalau cache juga punya
+    `stored(url, worksheet)` (salinan disk), `seed()` memakainya untuk start hangat.
+    """
+
+    def __init__(self, cache, sources: dict, interval=60.0, timeout=20.0):
+        self.cache = cache
+        self.sources = dict(sources)
+        self.interval = interval
+        self.timeout = timeout
+        self.errors = {}                 # nama sheet -> exception refresh terakhir yang gagal
+        self._warm = {}                  # nama sheet -> Warm; hanya diganti utuh, tidak diubah di tempat
+        self._fetch_lock = threading.RLock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()   # bangunkan thread latar (mis. tampilan live baru mulai)
+        self._watched = {}               # nama sheet -> batas waktu (monotonic) permintaan live terakhir
+        self._thread = None
+        self._pool = ThreadPoolExecutor(max_workers=max(len(self.sources), 1), thread_name_prefix="sheet-fetch")
+        self._inflight = {}              # nama sheet -> Future fetch yang belum diambil hasilnya
+
+    def _load(self, name, old: Warm | None) -> tuple:
+        """
+        Baca sheet mentah lalu parse seperlunya: tidak ada yang berubah -> pakai frame
+        lama; hanya ada baris baru di bawah -> parse baris baru saja lalu sambung;
+        selain itu parse ulang penuh. Perbandingan memakai hash per baris sheet mentah.
+        """
+        src = self.sources[name]
+        raw = self.cache.read(src.url, src.worksheet)
+        columns = tuple(raw.columns)
+        row_hash = _row_hash(raw)
+        parse = (lambda d: apply_schema(d, src.schema)) if src.schema else (lambda d: d)
+        if old is not None and old.columns == columns and len(row_hash) >= len(old.row_hash) \
+                and np.array_equal(row_hash[:len(old.row_hash)], old.row_hash):
+            if len(row_hash) == len(old.row_hash):
+                return "same", old.df, columns, row_hash
+            tail = parse(raw.iloc[len(old.row_hash):].reset_index(drop=True))
+            return "append", append_rows(old.df, tail), columns, row_hash
+        return "full", parse(raw), columns, row_hash
+
+    def seed(self) -> "SheetRefresher":
+        """
+        Isi data hangat dari salinan disk cache (`cache.stored`) untuk sheet yang belum
+        termuat, supaya rerun pertama setelah restart tidak menunggu unduhan. Siklus
+        pertama thread latar tetap mengecek sheet aslinya; kalau isinya sama dengan
+        salinan disk, frame hasil seed dipakai terus tanpa parse ulang.
+        """
+        stored = getattr(self.cache, "stored", None)
+        if stored is None:
+            return self
+        with self._fetch_lock:
+            fresh = {}
+            for name, src in self.sources.items():
+                hit = stored(src.url, src.worksheet) if name not in self._warm else None
+                if hit is None:
+                    continue
+                raw, saved_at = hit
+                df_ = apply_schema(raw.copy(), src.schema) if src.schema else raw
+                fresh[name] = Warm(0, df_, saved_at, 0, tuple(raw.columns), _row_hash(raw))
+            self._warm = {**self._warm, **fresh}
+        return self
+
+    def refresh(self, names=None) -> dict:
+        """Segarkan `names` (default semua sheet) sekarang, bersamaan; kembalikan dict Warm yang berlaku."""
+        with self._fetch_lock:
+            names = list(names or self.sources)
+            for name in names:
+                if name not in self._inflight:
+                    self._inflight[name] = self._pool.submit(self._load, name, self._warm.get(name))
+            deadline = time.monotonic() + self.timeout
+
+            current = self._warm
+            fresh = {}
+            for name in names:
+                future = self._inflight[name]
+                try:
+                    mode, df_, columns, row_hash = future.result(timeout=max(deadline - time.monotonic(), 0))
+                except Exception as e:
+                    if isinstance(e, FutureTimeout) and not future.done():
+                        # future dibiarkan jalan, hasilnya diambil siklus berikutnya
+                        self.errors[name] = TimeoutError(f"Sheet '{name}' tidak merespons dalam {self.timeout:g} detik")
+                        continue
+                    del self._inflight[name]
+                    self.errors[name] = e  # data lama tetap dipakai
+                    continue
+                del self._inflight[name]
+                self.errors.pop(name, None)
+                old = current.get(name)
+                now = time.time()
+                if mode == "same":
+                    fresh[name] = Warm(old.version, old.df, now, old.append_base, columns, row_hash)
+                elif mode == "append":
+                    fresh[name] = Warm(old.version + 1, df_, now, old.append_base, columns, row_hash)
+                else:
+                    version = 0 if old is None else old.version + 1
+                    fresh[name] = Warm(version, df_, now, version, columns, row_hash)
+            self._warm = {**current, **fresh}
+            return self._warm
+
+    def get_many(self, names) -> dict:
+        """
+        Data hangat untuk `names` (nama -> Warm). Sheet yang belum pernah dimuat diambil
+        sekali secara sinkron, bersamaan; yang tetap gagal tidak ada di hasil (lihat `errors`).
+        """
+        warm = self._warm
+        if any(name not in warm for name in names):
+            with self._fetch_lock:  # thread latar mungkin sedang memuatnya; tunggu, jangan ambil dobel
+                cold = [name for name in names if name not in self._warm]
+                warm = self.refresh(cold) if cold else self._warm
+        return {name: warm[name] for name in names if name in warm}
+
+    def get(self, name) -> Warm:
+        """Data hangat untuk `name`; exception fetch terakhir dilempar kalau belum pernah berhasil dimuat."""
+        warm = self.get_many([name]).get(name)
+        if warm is None:
+            raise self.errors[name]
+        return warm
+
+    def watch(self, name, grace=None):
+        """
+        Tandai `name` sedang ditonton tampilan live: selama `grace` detik ke depan
+        (default 3× `live_interval`) sheet dicek tiap `live_interval`. Tampilan live
+        cukup memanggil ini di setiap rerun-nya; kalau berhenti, jeda kembali normal.
+        """
+        live = self.sources[name].live_interval
+        if not live:
+            return
+        now = time.monotonic()
+        was_watched = self._watched.get(name, 0.0) > now
+        self._watched[name] = now + (grace or 3 * live)
+        if not was_watched:
+            self._wake.set()
+
+    def _interval(self, name) -> float:
+        live = self.sources[name].live_interval
+        return live if live and self._watched.get(name, 0.0) > time.monotonic() else self.interval
+
+    def _run(self):
+        refreshed_at = dict.fromkeys(self.sources, float("-inf"))
+        while not self._stop.is_set():
+            now = time.monotonic()
+            due = [name for name in self.sources if refreshed_at[name] + self._interval(name) <= now]
+            if due:
+                self.refresh(due)
+                now = time.monotonic()
+                for name in due:
+                    refreshed_at[name] = now
+            next_at = min(refreshed_at[name] + self._interval(name) for name in self.sources)
+            self._wake.wait(max(next_at - time.monotonic(), 0))
+            self._wake.clear()
+
+    def start(self) -> "SheetRefresher":
+        """Jalankan thread penyegar (daemon); aman dipanggil berulang."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sheet-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _row_hash(raw: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(raw, index=False).to_numpy()
@@ -0,0 +1,132 @@
+"""Skema kolom per sheet dan konversi tipe sekali jalan saat data dibaca."""
+import re
+from dataclasses import dataclass
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Format tanggal sheet mapping/reclaimer (locale Indonesia: hari dulu). ISO tahun-dulu
+# ikut diterima karena tidak mungkin tertukar dengan hari/bulan; format bulan-dulu tidak.
+DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M")
+
+# Kolom segmen profil "Tiang d1-d2" (Tiang 1-2 ... Tiang 34-35, dst.)
+TIANG_SEGMENT_RE = re.compile(r"(?i)^tiang\s*(\d+)\s*-\s*(\d+)$")
+
+
+@dataclass(frozen=True)
+class Col:
+    """Deklarasi satu kolom: dtype hasil + cara membaca teks dari sheet."""
+    dtype: str                      # "datetime" | "float32" | "category" | "string"
+    formats: tuple = DATE_FORMATS   # khusus datetime, varian satu locale; nilai lain jadi NaT
+    decimal: str = ","              # khusus float32, pemisah desimal selain "."
+
+    def __post_init__(self):
+        # hari-dulu dan bulan-dulu dalam satu kolom = tanggal seperti 1/2 dibaca beda per baris
+        if self.dtype == "datetime" and any("%d/%m" in f for f in self.formats) \
+                and any("%m/%d" in f for f in self.formats):
+            raise ValueError(f"Format tanggal mencampur hari-dulu dan bulan-dulu: {self.formats}")
+
+
+MAPPING_SCHEMA = {
+    "tanggal": Col("datetime"),
+    "tipe": Col("category"),
+    "tongkang": Col("category"),
+    "tiang_start": Col("float32"),
+    "tiang_end": Col("float32"),
+    "lebar(tiang)": Col("float32"),
+    "sudut_start": Col("float32"),
+    "sudut_end": Col("float32"),
+    "Ash_%": Col("float32"),
+    "Sulfur_%": Col("float32"),
+    TIANG_SEGMENT_RE: Col("float32"),
+}
+
+RECLAIMER_SCHEMA = {
+    "tanggal": Col("datetime"),
+    "grup": Col("category"),
+    "tiang_awal": Col("float32"),
+    "tiang_ahir": Col("float32"),
+    "ketinggian_boom": Col("float32"),
+}
+
+GFORM_SCHEMA = {
+    # timestamp Google Form mengikuti locale spreadsheet jawaban (Indonesia: hari dulu)
+    "Timestamp": Col("datetime", formats=("%d/%m/%Y %H:%M:%S",)),
+    "Grup": Col("category"),
+    "Tiang Awal": Col("float32"),
+    "Tiang Akhir": Col("float32"),
+    "Nama Tongkang": Col("category"),
+    "Ada Stacking?": Col("category"),
+    "Tipe Coal": Col("category"),
+    "Sudut Stacking": Col("string"),   # "30-45" atau satu sudut, diurai di ingest.parse_sudut
+    "Ketinggian Stacking": Col("float32"),
+    "Ketinggian pile": Col("float32"),
+}
+
+
+def parse_dates(values: pd.Series, formats=DATE_FORMATS) -> pd.Series:
+    """
+    Parse tanggal dengan format eksplisit (dicoba berurutan). Nilai yang tidak cocok
+    dengan format mana pun jadi NaT, bukan ditebak per baris, supaya satu kolom tidak
+    pernah berisi campuran bacaan hari/bulan.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    raw = values.astype("string").str.strip()
+    out = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    todo = raw.notna() & (raw != "")
+    for fmt in formats:
+        if not todo.any():
+            break
+        parsed = pd.to_datetime(raw[todo], format=fmt, errors="coerce")
+        out.loc[parsed.index] = parsed
+        todo &= out.isna()
+    return out
+
+
+def parse_numbers(values: pd.Series, decimal=",", dtype="float32") -> pd.Series:
+    """Konversi angka (koma desimal diterima) ke dtype ringkas; nilai tidak valid jadi NaN."""
+    if values.dtype == object or pd.api.types.is_string_dtype(values):
+        values = values.astype("string").str.strip()
+        if decimal != ".":
+            values = values.str.replace(decimal, ".", regex=False)
+    return pd.to_numeric(values, errors="coerce").astype(dtype)
+
+
+def _convert(values: pd.Series, col: Col) -> pd.Series:
+    if col.dtype == "datetime":
+        return parse_dates(values, col.formats)
+    if col.dtype == "float32":
+        return parse_numbers(values, col.decimal)
+    if col.dtype == "category":
+        text = values.astype("string").str.strip()
+        return text.where(text != "").astype("category")
+    return values.astype("string")
+
+
+def apply_schema(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """Terapkan skema ke `df` (in-place) dan kembalikan `df`. Key skema boleh nama kolom atau regex."""
+    patterns = [(k, col) for k, col in schema.items() if isinstance(k, re.Pattern)]
+    for name in df.columns:
+        col = schema.get(name)
+        if col is None:
+            col = next((c for pat, c in patterns if pat.match(str(name).strip())), None)
+        if col is not None:
+            df[name] = _convert(df[name], col)
+    return df
+
+
+def empty_frame(schema: dict) -> pd.DataFrame:
+    """Frame kosong dengan kolom bernama di `schema` (tanpa kolom regex), tipe sesuai skema."""
+    names = [k for k in schema if isinstance(k, str)]
+    return apply_schema(pd.DataFrame({name: pd.Series(dtype=object) for name in names}), schema)
+
+
+def append_rows(df: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """Sambung `new` di bawah `df` (index baru 0..n-1); kolom kategori tetap kategori dengan gabungan kategorinya."""
+    out = pd.concat([df, new], ignore_index=True)
+    for name in df.columns:
+        if isinstance(df[name].dtype, pd.CategoricalDtype) and name in new.columns \
+                and isinstance(new[name].dtype, pd.CategoricalDtype):
+            out[name] = union_categoricals([df[name], new[name]], ignore_order=True)
+    return out
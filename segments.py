@@ -0,0 +1,174 @@
+"""Profil segmen "Tiang d1-d2": deteksi kolom dan matriks tanggal × segmen (tanpa Streamlit)."""
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from schema import TIANG_SEGMENT_RE
+
+
+@dataclass(frozen=True)
+class SegmentLayout:
+    """Susunan kolom segmen "Tiang d1-d2" dalam satu header sheet, urut angka awal segmen."""
+    labels: tuple      # nama kolom persis seperti di header
+    start: tuple       # nomor tiang awal tiap segmen
+    end: tuple         # nomor tiang akhir tiap segmen
+
+    def __len__(self):
+        return len(self.labels)
+
+
+@lru_cache(maxsize=32)
+def segment_layout(header: tuple) -> SegmentLayout:
+    """
+    Deteksi kolom segmen dari `header` (tuple nama kolom). Hasil di-cache per header,
+    jadi regex hanya jalan sekali selama susunan kolom sheet tidak berubah; kolom
+    segmen baru (mis. "Tiang 35-36") otomatis ikut begitu header-nya berubah.
+    """
+    found = []
+    for name in header:
+        m = TIANG_SEGMENT_RE.match(str(name).strip())
+        if m:
+            found.append((int(m.group(1)), int(m.group(2)), name))
+    found.sort(key=lambda f: f[0])
+    return SegmentLayout(
+        labels=tuple(f[2] for f in found),
+        start=tuple(f[0] for f in found),
+        end=tuple(f[1] for f in found),
+    )
+
+
+@dataclass
+class SegmentMatrix:
+    """Nilai segmen per tanggal: baris = tanggal (lama -> baru), kolom = segmen; NaN = tidak diukur."""
+    tanggal: np.ndarray    # datetime64[ns], satu baris per tanggal
+    labels: list           # nama kolom segmen, urut angka awal
+    start: np.ndarray      # nomor tiang awal tiap segmen
+    end: np.ndarray        # nomor tiang akhir tiap segmen
+    z: np.ndarray          # float (n_tanggal, n_segmen)
+    tipe: np.ndarray | None = None  # tipe baris sumber tiap tanggal (kalau sheet punya kolom `tipe`)
+
+    def between(self, since=None, before=None) -> "SegmentMatrix":
+        """Baris dengan tanggal di [since, before)."""
+        lo = 0 if since is None else np.searchsorted(self.tanggal, np.datetime64(pd.Timestamp(since), "ns"), side="left")
+        hi = len(self.tanggal) if before is None else np.searchsorted(self.tanggal, np.datetime64(pd.Timestamp(before), "ns"), side="left")
+        return SegmentMatrix(self.tanggal[lo:hi], self.labels, self.start, self.end, self.z[lo:hi],
+                             None if self.tipe is None else self.tipe[lo:hi])
+
+    def to_frame(self) -> pd.DataFrame:
+        """Tabel tanggal + kolom segmen (untuk ditampilkan / diunduh)."""
+        out = pd.DataFrame(self.z, columns=self.labels)
+        out.insert(0, "tanggal", self.tanggal)
+        return out
+
+    def date_ticks(self, max_ticks=12) -> tuple:
+        """Indeks baris + teks tanggal untuk sumbu tanggal, maksimal ~`max_ticks` label (baris terakhir selalu ada)."""
+        n = len(self.tanggal)
+        idx = list(range(0, n, max(1, n // max_ticks))) if n > max_ticks else list(range(n))
+        if n and idx[-1] != n - 1:
+            idx.append(n - 1)
+        text = pd.DatetimeIndex(self.tanggal[idx]).strftime("%Y-%m-%d").tolist()
+        return idx, text
+
+
+def segment_matrix(df: pd.DataFrame) -> SegmentMatrix:
+    """Matriks segmen dari sheet mapping; tanggal kembar diambil baris sheet yang terakhir."""
+    layout = segment_layout(tuple(df.columns))
+    labels = list(layout.labels)
+    dfm = df.dropna(subset=["tanggal"])
+    dfm = dfm.sort_values("tanggal", kind="stable").groupby("tanggal", as_index=False).tail(1)
+    return SegmentMatrix(
+        tanggal=dfm["tanggal"].to_numpy(dtype="datetime64[ns]"),
+        labels=labels,
+        start=np.array(layout.start, dtype=np.int64),
+        end=np.array(layout.end, dtype=np.int64),
+        z=dfm[labels].to_numpy(dtype=float) if labels else np.empty((len(dfm), 0)),
+        tipe=dfm["tipe"].to_numpy(dtype=object) if "tipe" in dfm.columns else None,
+    )
+
+
+# Level of detail sumbu tanggal: harian -> mingguan -> bulanan (kode periode pandas)
+LOD_FREQS = {"D": "Harian", "W": "Mingguan", "M": "Bulanan"}
+
+
+def _period_start(tanggal: np.ndarray, freq: str) -> np.ndarray:
+    return pd.DatetimeIndex(tanggal).to_period(freq).start_time.to_numpy(dtype="datetime64[ns]")
+
+
+def choose_lod(tanggal: np.ndarray, max_rows=60) -> str:
+    """Periode paling halus yang menghasilkan <= `max_rows` baris (bulanan kalau tetap lebih)."""
+    for freq in LOD_FREQS:
+        if len(tanggal) == 0 or len(np.unique(_period_start(tanggal, freq))) <= max_rows:
+            return freq
+    return freq
+
+
+def resample_segments(seg: SegmentMatrix, freq="W", how="mean") -> SegmentMatrix:
+    """
+    Agregasi sumbu tanggal ke periode `freq` (lihat LOD_FREQS) dengan min / mean / max per
+    segmen, NaN diabaikan. Baris sudah urut tanggal, jadi tiap periode satu blok
+    berurutan dan cukup satu `reduceat` per statistik. Tanggal hasil = awal periode.
+    """
+    if not len(seg.tanggal):
+        return seg
+    period = _period_start(seg.tanggal, freq)
+    starts = np.flatnonzero(np.r_[True, period[1:] != period[:-1]])
+    ends = np.r_[starts[1:], len(period)] - 1
+    z = seg.z
+    if how == "min":
+        agg = np.fmin.reduceat(z, starts, axis=0)
+    elif how == "max":
+        agg = np.fmax.reduceat(z, starts, axis=0)
+    elif how == "mean":
+        valid = ~np.isnan(z)
+        sums = np.add.reduceat(np.where(valid, z, 0.0), starts, axis=0)
+        counts = np.add.reduceat(valid.astype(np.int64), starts, axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            agg = np.where(counts > 0, sums / counts, np.nan)
+    else:
+        raise ValueError(f"Agregasi tidak dikenal: {how!r}")
+    return SegmentMatrix(period[starts], seg.labels, seg.start, seg.end, agg,
+                         None if seg.tipe is None else seg.tipe[ends])
+
+
+def recent_segment_matrix(df: pd.DataFrame, days=30) -> SegmentMatrix:
+    """Matriks segmen untuk `days` hari terakhir, dihitung dari tanggal terbaru di `df`."""
+    dfv = df.dropna(subset=["tanggal"])
+    if not dfv.empty:
+        latest = dfv["tanggal"].max()
+        dfv = dfv[dfv["tanggal"].between(latest - pd.Timedelta(days=days), latest)]
+    return segment_matrix(dfv)
+
+
+def ffill_rows(z: np.ndarray) -> np.ndarray:
+    """Isi NaN dengan nilai terakhir yang ada di baris sebelumnya (per kolom), tanpa loop Python."""
+    if not z.size:
+        return z.copy()
+    idx = np.where(np.isnan(z), 0, np.arange(z.shape[0])[:, None])
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return z[idx, np.arange(z.shape[1])]
+
+
+def latest_profile(seg: SegmentMatrix, before=None, since=None) -> pd.DataFrame:
+    """
+    Nilai terakhir yang tersedia per segmen untuk tanggal di [since, before), beserta
+    tanggal dan tipe baris sumbernya. Semua segmen dihitung sekaligus (argmax pada
+    mask notna yang dibalik); segmen tanpa nilai berisi NaN/NaT dan `ada_data` False.
+    """
+    lo = 0 if since is None else np.searchsorted(seg.tanggal, np.datetime64(pd.Timestamp(since), "ns"), side="left")
+    hi = len(seg.tanggal) if before is None else np.searchsorted(seg.tanggal, np.datetime64(pd.Timestamp(before), "ns"), side="left")
+    valid = ~np.isnan(seg.z[lo:hi])
+    found = valid.any(axis=0)
+    # baris valid terakhir per kolom = argmax pertama pada urutan baris terbalik
+    row = lo + (len(valid) - 1 - valid[::-1].argmax(axis=0)) if len(valid) else np.zeros(len(found), dtype=np.int64)
+    row = np.where(found, row, 0)
+
+    tanggal = np.full(len(found), np.datetime64("NaT"), dtype="datetime64[ns]")
+    nilai = np.full(len(found), np.nan)
+    tipe = np.full(len(found), np.nan, dtype=object)
+    tanggal[found] = seg.tanggal[row[found]]
+    nilai[found] = seg.z[row[found], np.flatnonzero(found)]
+    if seg.tipe is not None:
+        tipe[found] = seg.tipe[row[found]]
+    return pd.DataFrame({"segmen": seg.labels, "tanggal": tanggal, "nilai": nilai, "tipe": tipe, "ada_data": found})
@@ -0,0 +1,135 @@
+"""Akses Google Sheet dengan cache lokal di disk (tanpa Streamlit)."""
+import hashlib
+import json
+import os
+import re
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+CACHE_DIR = os.environ.get("STOCKPILE_CACHE_DIR", ".cache/sheets")
+
+
+def normalize_sheet_url(url: str) -> str:
+    """
+    Samakan varian URL spreadsheet (`/sheets/d/` vs `/spreadsheets/d/`, `?gid=` vs `#gid=`)
+    menjadi satu bentuk, supaya sheet yang sama memakai satu cache key.
+    """
+    m = re.search(r"/d/([^/?#]+)", url)
+    if not m:
+        return url
+    parsed = urlparse(url)
+    gid = re.findall(r"gid=(\w+)", parsed.fragment) or parse_qs(parsed.query).get("gid", [])
+    canonical = f"https://docs.google.com/spreadsheets/d/{m.group(1)}/edit"
+    return f"{canonical}#gid={gid[0]}" if gid else canonical
+
+
+def _clean_columns(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+
+def to_arrow_safe(df: pd.DataFrame) -> pd.DataFrame:
+    # kolom object campuran (angka + teks) tidak bisa ditulis ke Parquet -> simpan sebagai teks
+    out = df.copy()
+    for c in out.columns:
+        if out[c].dtype == object:
+            out[c] = out[c].where(out[c].isna(), out[c].astype(str))
+    return out
+
+
+class SheetCache:
+    """
+    Cache lokal (Parquet + metadata JSON) untuk setiap spreadsheet/worksheet.
+
+    - Dalam `ttl` detik sejak pengambilan terakhir, data dibaca langsung dari disk.
+    - Setelah itu sheet diambil ulang penuh. `conn.read` (st-gsheets-connection)
+      selalu mengunduh seluruh worksheet, jadi tidak ada cek perubahan yang lebih
+      murah dari satu unduhan penuh; deteksi baris yang berubah / bertambah
+      dilakukan `SheetRefresher` dengan hash per baris setelah data terunduh.
+    - Parquet hanya ditulis ulang kalau isi unduhan berbeda dari salinan disk
+      (digest di metadata); sheet yang tidak berubah tidak menulis apa pun
+      kecuali cap waktu metadata saat `ttl` > 0.
+
+    Penyegar di data.py memakai `ttl=0` karena jadwalnya sendiri sudah mengatur
+    kapan unduh ulang: setiap siklus = tepat satu unduhan penuh per sheet (dulu
+    probe kolom pertama + unduhan penuh = dua unduhan saat sheet berubah). Salinan
+    disk dipakai penyegar untuk start hangat setelah restart (`stored`).
+
+    `conn` cukup objek dengan method `read(spreadsheet=..., worksheet=..., ttl=..., **options)`,
+    jadi bisa diganti koneksi palsu untuk pengujian lokal.
+    """
+
+    def __init__(self, conn, cache_dir=CACHE_DIR, ttl=60, conn_ttl=5):
+        self.conn = conn
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.conn_ttl = conn_ttl
+
+    def _paths(self, url, worksheet):
+        key = hashlib.sha1(f"{url}|{worksheet or ''}".encode("utf-8")).hexdigest()[:16]
+        base = os.path.join(self.cache_dir, key)
+        return base + ".parquet", base + ".json"
+
+    def _fetch(self, url, worksheet, **options) -> pd.DataFrame:
+        if worksheet:
+            df_ = self.conn.read(spreadsheet=url, worksheet=worksheet, ttl=self.conn_ttl, **options)
+        else:
+            df_ = self.conn.read(spreadsheet=url, ttl=self.conn_ttl, **options)
+        return _clean_columns(df_)
+
+    def _load_meta(self, meta_path):
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, meta_path, meta):
+        tmp = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+
+    def _store(self, url, worksheet, df, digest):
+        data_path, meta_path = self._paths(url, worksheet)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{data_path}.{os.getpid()}.tmp"
+        to_arrow_safe(df).to_parquet(tmp, index=False)
+        os.replace(tmp, data_path)
+        self._write_meta(meta_path, {"url": url, "worksheet": worksheet, "fetched_at": time.time(), "digest": digest})
+
+    def read(self, url: str, worksheet: str | None = None) -> pd.DataFrame:
+        """Baca sheet: dari disk dalam `ttl` detik sejak pengambilan terakhir, selain itu unduh ulang penuh."""
+        data_path, meta_path = self._paths(url, worksheet)
+        meta = self._load_meta(meta_path)
+        stored = meta is not None and os.path.exists(data_path)
+        if stored and time.time() - meta.get("fetched_at", 0) < self.ttl:
+            return pd.read_parquet(data_path)
+
+        df_ = self._fetch(url, worksheet)
+        digest = _digest(df_)
+        if not stored or meta.get("digest") != digest:
+            self._store(url, worksheet, df_, digest)
+        elif self.ttl:
+            self._write_meta(meta_path, {**meta, "fetched_at": time.time()})
+        return df_
+
+    def stored(self, url: str, worksheet: str | None = None) -> tuple | None:
+        """Salinan disk terakhir sheet (frame, waktu simpan epoch) tanpa unduh; None kalau belum ada / rusak."""
+        data_path, meta_path = self._paths(url, worksheet)
+        meta = self._load_meta(meta_path)
+        if meta is None or not os.path.exists(data_path):
+            return None
+        try:
+            return pd.read_parquet(data_path), meta.get("fetched_at", os.path.getmtime(data_path))
+        except (OSError, ValueError):
+            return None
+
+
+def _digest(df: pd.DataFrame) -> str:
+    # header + hash per baris: sama persis -> salinan disk tidak perlu ditulis ulang
+    h = hashlib.sha1(repr(tuple(df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
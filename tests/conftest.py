@@ -0,0 +1,5 @@
+import os
+import sys
+
+# modul aplikasi ada di root repo (script datar, bukan paket)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
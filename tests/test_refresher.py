@@ -0,0 +1,93 @@
+"""SheetRefresher + SheetCache dengan koneksi palsu (tanpa Streamlit, tanpa jaringan)."""
+import io
+import threading
+
+import pandas as pd
+import pytest
+
+from refresher import SheetRefresher, SheetSource
+from schema import MAPPING_SCHEMA
+from sheets import SheetCache
+
+HEADER = "tanggal,tipe,tiang_start,tiang_end,sudut_start,sudut_end,Ash_%\n"
+ROWS = ["01/01/2024,Coal HS,1,5,0,30,\"5,2\"\n", "02/01/2024,Coal NS,10,15,0,30,\n"]
+
+
+class FakeConn:
+    """Pengganti st-gsheets-connection: `read` mengembalikan isi `csv` saat ini."""
+
+    def __init__(self, csv, block=None):
+        self.csv = csv
+        self.block = block  # Event: kalau diisi, read menunggu sampai di-set
+        self.calls = 0
+
+    def read(self, spreadsheet, worksheet=None, ttl=None, **options):
+        self.calls += 1
+        if self.block is not None:
+            self.block.wait(5)
+        return pd.read_csv(io.StringIO(self.csv), **options)
+
+
+def make_refresher(conn, tmp_path, timeout=5.0):
+    cache = SheetCache(conn, cache_dir=str(tmp_path), ttl=0)
+    return SheetRefresher(cache, {"mapping": SheetSource("fake://mapping", schema=MAPPING_SCHEMA)}, timeout=timeout)
+
+
+def test_unchanged_sheet_keeps_version_and_frame(tmp_path):
+    refresher = make_refresher(FakeConn(HEADER + "".join(ROWS)), tmp_path)
+    first = refresher.refresh()["mapping"]
+    again = refresher.refresh()["mapping"]
+    assert again.version == first.version
+    assert again.df is first.df
+    assert first.df["Ash_%"].iloc[0] == pytest.approx(5.2)
+
+
+def test_appended_rows_are_parsed_as_tail(tmp_path):
+    conn = FakeConn(HEADER + "".join(ROWS))
+    refresher = make_refresher(conn, tmp_path)
+    first = refresher.refresh()["mapping"]
+    conn.csv += "03/01/2024,Coal HS,20,25,0,30,\"7,0\"\n"
+    warm = refresher.refresh()["mapping"]
+    assert warm.version == first.version + 1
+    assert warm.append_base == first.append_base
+    new_rows = warm.rows_after(first.version, len(first.df))
+    assert list(new_rows["tiang_start"]) == [20.0]
+    assert new_rows["tanggal"].iloc[0] == pd.Timestamp("2024-01-03")
+    assert isinstance(warm.df["tipe"].dtype, pd.CategoricalDtype)
+
+
+def test_rewritten_row_forces_full_reload(tmp_path):
+    conn = FakeConn(HEADER + "".join(ROWS))
+    refresher = make_refresher(conn, tmp_path)
+    first = refresher.refresh()["mapping"]
+    conn.csv = HEADER + ROWS[0].replace("Coal HS", "Coal Normal") + ROWS[1]
+    warm = refresher.refresh()["mapping"]
+    assert warm.version == first.version + 1
+    assert warm.append_base == warm.version
+    assert warm.rows_after(first.version, len(first.df)) is None
+    assert warm.df["tipe"].iloc[0] == "Coal Normal"
+
+
+def test_timeout_keeps_last_data(tmp_path):
+    conn = FakeConn(HEADER + "".join(ROWS))
+    refresher = make_refresher(conn, tmp_path, timeout=0.2)
+    first = refresher.refresh()["mapping"]
+    conn.block = threading.Event()
+    try:
+        warm = refresher.refresh()["mapping"]
+        assert warm is first
+        assert isinstance(refresher.errors["mapping"], TimeoutError)
+    finally:
+        conn.block.set()
+        refresher.stop()
+
+
+def test_seed_from_disk_then_unchanged_fetch(tmp_path):
+    conn = FakeConn(HEADER + "".join(ROWS))
+    make_refresher(conn, tmp_path).refresh()
+    restarted = make_refresher(conn, tmp_path).seed()
+    seeded = restarted.get_many(["mapping"])["mapping"]
+    assert conn.calls == 1  # data awal dari salinan disk, bukan unduhan
+    assert len(seeded.df) == len(ROWS)
+    warm = restarted.refresh()["mapping"]
+    assert warm.version == seeded.version and warm.df is seeded.df
@@ -0,0 +1,90 @@
+"""Estimasi volume & tonase stockpile dari profil segmen tiang (tanpa Streamlit)."""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from grid import OccupancyGrid
+from segments import SegmentMatrix, ffill_rows, segment_matrix
+from yard import YardState, piles_history
+
+
+@dataclass(frozen=True)
+class YardGeometry:
+    """Parameter konversi profil segmen ke volume. Frozen supaya bisa jadi key cache."""
+    tiang_spacing: float = 1.0    # jarak antar tiang (m)
+    sudut_width: float = 1.0      # lebar yard per derajat sudut (m)
+    fill_factor: float = 1.0      # koreksi bentuk penampang (1.0 = balok, ~0.5 = segitiga)
+    density: float = 0.85         # bulk density default (t/m3)
+    density_by_tipe: tuple = ()   # pasangan (tipe, t/m3) untuk tipe yang berbeda dari default
+
+
+@dataclass
+class Inventory:
+    """Deret waktu persediaan per tipe batubara (index = tanggal, kolom = tipe)."""
+    volume: pd.DataFrame   # m3
+    tonnage: pd.DataFrame  # ton
+
+
+def segment_widths(grids, seg_start: np.ndarray, tipes: list) -> np.ndarray:
+    """
+    Lebar sudut (derajat) tiap tipe di setiap segmen, per tanggal: array (tanggal, segmen, tipe).
+    Segmen "Tiang a-b" membaca baris tiang `a` dari raster okupansi tanggal tersebut;
+    grid yang sama (objek yang sama) untuk beberapa tanggal cukup dihitung sekali.
+    """
+    widths = np.zeros((len(grids), len(seg_start), len(tipes)))
+    index = {t: i for i, t in enumerate(tipes)}
+    done = {}  # id(grid) -> tanggal pertama yang sudah dihitung
+    for d, grid in enumerate(grids):
+        first = done.setdefault(id(grid), d)
+        if first != d:
+            widths[d] = widths[first]
+            continue
+        rows = seg_start - grid.tiang0
+        ok = (rows >= 0) & (rows < grid.shape[0])
+        if not ok.any():
+            continue
+        codes = grid.tipe_code[rows[ok]]  # (segmen, bin sudut)
+        for k, tipe in enumerate(grid.tipes):
+            widths[d, ok, index[tipe]] = (codes == k).sum(axis=1) * grid.sudut_step
+    return widths
+
+
+def estimate_inventory(seg: SegmentMatrix, grids, geometry: YardGeometry = YardGeometry()) -> Inventory:
+    """
+    Volume & tonase per tanggal × tipe dalam satu kali hitung NumPy.
+
+    Tinggi segmen = nilai terakhir yang tersedia s/d tanggal tersebut (ffill), dikali
+    panjang segmen (tiang), lebar sudut yang ditempati tiap tipe (dari `grids`, sejajar
+    dengan `seg.tanggal`) dan parameter `geometry`.
+    """
+    tipes = sorted({t for g in grids for t in g.tipes})
+    heights = np.nan_to_num(ffill_rows(seg.z), nan=0.0)               # (tanggal, segmen)
+    lengths = (seg.end - seg.start).astype(float) * geometry.tiang_spacing
+    widths = segment_widths(grids, seg.start, tipes) * geometry.sudut_width
+    volume = np.einsum("ds,s,dsk->dk", heights, lengths, widths) * geometry.fill_factor
+
+    density_map = dict(geometry.density_by_tipe)
+    density = np.array([density_map.get(t, geometry.density) for t in tipes], dtype=float)
+    index = pd.DatetimeIndex(seg.tanggal, name="tanggal")
+    return Inventory(
+        volume=pd.DataFrame(volume, index=index, columns=tipes),
+        tonnage=pd.DataFrame(volume * density, index=index, columns=tipes),
+    )
+
+
+def inventory_history(yard_state: YardState, df_mapping: pd.DataFrame,
+                      geometry: YardGeometry = YardGeometry(), window_days=30) -> Inventory:
+    """
+    Persediaan untuk setiap tanggal di sheet mapping, pile per tanggal sama seperti snapshot
+    halaman. Pile semua tanggal diambil dengan satu sapuan (`piles_history`), dan raster
+    okupansi hanya dibangun ulang kalau himpunan pile berubah.
+    """
+    seg = segment_matrix(df_mapping)
+    grids, piles_prev = [], None
+    for piles in piles_history(yard_state, seg.tanggal, window_days):
+        if piles is not piles_prev:
+            grid = OccupancyGrid(piles)
+            piles_prev = piles
+        grids.append(grid)
+    return estimate_inventory(seg, grids, geometry)
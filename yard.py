@@ -0,0 +1,435 @@
+"""Engine pemilihan coal pile terbaru di yard (tanpa Streamlit)."""
+import bisect
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from grid import OccupancyGrid
+
+RECT_COLS = ["tiang_start", "tiang_end", "sudut_start", "sudut_end"]
+NAT_NS = pd.NaT.value  # nilai int64 untuk tanggal kosong
+
+
+def overlap_mask(ts, te, ss, se, kts, kte, kss, kse, rule="overlap"):
+    """
+    Versi vektor dari `is_overlap(r1, r2)`: r1 = (ts, te, ss, se), r2 = (kts, kte, kss, kse).
+
+    rule="overlap" : tiang DAN sudut harus tumpang tindih (logika app4.py).
+    rule="tiang"   : logika pages/mapping.py, sudut hanya memisahkan kalau
+                     kedua rentang sudut terbalik/kosong -> praktis cukup tiang.
+    Perbandingan dengan NaN selalu False, sama seperti versi per-baris.
+    """
+    overlap_x = (ts < kte) & (kts < te)
+    if rule == "overlap":
+        overlap_y = ~((se <= kss) | (ss >= kse))
+    elif rule == "tiang":
+        overlap_y = ~((se <= kss) & (ss >= kse))
+    else:
+        raise ValueError(f"rule tidak dikenal: {rule!r}")
+    return overlap_x & overlap_y
+
+
+def latest_nonoverlapping(ts, te, ss, se, rule="overlap") -> np.ndarray:
+    """
+    Pilih rectangle terbaru yang tidak tumpang tindih.
+
+    Array input sudah urut prioritas (terbaru dulu). Baris dipilih kalau tidak
+    overlap dengan baris yang sudah terpilih sebelumnya. Mengembalikan posisi
+    baris terpilih (urut prioritas).
+
+    Geometri yang sama persis dan overlap dengan dirinya sendiri hanya perlu
+    dicek sekali (kemunculan pertama): duplikat berikutnya pasti ditolak,
+    entah oleh kemunculan pertama itu sendiri atau oleh rectangle yang sudah
+    menolaknya. Jadi loop hanya berjalan atas geometri unik, bukan seluruh history.
+    """
+    ts, te, ss, se = (np.asarray(a, dtype=float) for a in (ts, te, ss, se))
+    n = len(ts)
+    if n == 0:
+        return np.empty(0, dtype=np.intp)
+
+    self_overlap = overlap_mask(ts, te, ss, se, ts, te, ss, se, rule)
+    duplicate = pd.DataFrame({"ts": ts, "te": te, "ss": ss, "se": se}).duplicated().to_numpy()
+    candidates = np.flatnonzero(~(duplicate & self_overlap))
+
+    # Greedy per kandidat diganti filter vektor: kandidat terdepan yang tersisa pasti
+    # terpilih (tidak overlap dengan yang sudah terpilih, semua di depannya sudah
+    # diputuskan), lalu semua sisa yang overlap dengannya dibuang sekaligus. Jumlah
+    # putaran = jumlah pile terpilih, bukan jumlah kandidat.
+    kept = []
+    rest = candidates
+    while len(rest):
+        i = rest[0]
+        kept.append(i)
+        rest = rest[1:]
+        rest = rest[~overlap_mask(ts[rest], te[rest], ss[rest], se[rest], ts[i], te[i], ss[i], se[i], rule)]
+    return np.array(kept, dtype=np.intp)
+
+
+def rect_arrays(df: pd.DataFrame) -> list:
+    """Ambil kolom tiang/sudut sebagai array float (NaN untuk nilai kosong)."""
+    return [df[c].to_numpy(dtype=float, na_value=np.nan) for c in RECT_COLS]
+
+
+def select_latest_piles(df: pd.DataFrame, rule="overlap") -> pd.DataFrame:
+    """
+    Pengganti loop `iterrows()` + `is_overlap`: urutkan tanggal terbaru dulu,
+    lalu ambil baris yang tidak tumpang tindih dengan baris lebih baru yang terpilih.
+    Hasil (urut terbaru -> terlama) identik dengan loop lama.
+    """
+    df_sorted = df.sort_values("tanggal", ascending=False)
+    kept = latest_nonoverlapping(*rect_arrays(df_sorted), rule=rule)
+    return df_sorted.iloc[kept].copy()
+
+
+def _geom_key(ts, te, ss, se):
+    # NaN dinormalisasi ke None supaya geometri yang sama tetap satu key
+    return tuple(None if v != v else v for v in (ts, te, ss, se))
+
+
+class YardState:
+    """
+    State yard persisten untuk dipakai lintas rerun.
+
+    `update(df)` hanya memproses baris mapping yang belum pernah dilihat
+    (baris baru di bawah sheet); kalau hash baris yang sudah diproses berubah
+    (baris lama diedit / dihapus), state dibangun ulang dari awal.
+    `resolve(before)` mengembalikan pile terpilih untuk tanggal < `before`
+    tanpa memutar ulang seluruh history: untuk tiap
+    geometri cukup diambil kemunculan terbarunya, lalu seleksi overlap hanya
+    berjalan atas geometri unik tersebut.
+
+    Tanggal yang sama diurutkan berdasarkan urutan baris di sheet (baris lebih
+    bawah dianggap lebih baru). Baris tanpa tanggal punya prioritas terendah
+    dan hanya ikut kalau `before` tidak diisi.
+    """
+
+    def __init__(self, rule="overlap"):
+        self.rule = rule
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.frame = None         # baris yang sudah diproses (urutan sheet)
+        self.last_tanggal = pd.NaT
+        self._hash_cols = None    # kolom yang di-hash untuk deteksi editan baris lama
+        self._row_hash = np.empty(0, dtype=np.uint64)  # hash per baris yang sudah diproses
+        self._geom_ids = {}       # geometri -> id
+        self._geoms = []          # id -> (ts, te, ss, se)
+        self._occurrences = []    # id -> list (tanggal_ns, posisi) terurut
+
+    def reset(self):
+        """Kosongkan state; `update` berikutnya memproses ulang semua baris."""
+        with self._lock:
+            self._reset()
+
+    def __len__(self):
+        return 0 if self.frame is None else len(self.frame)
+
+    def update(self, df: pd.DataFrame) -> int:
+        """Terapkan baris baru dari `df` (urutan sheet). Mengembalikan jumlah baris baru."""
+        with self._lock:
+            n_done = len(self)
+            if n_done and (len(df) < n_done or not set(self._hash_cols) <= set(df.columns)
+                           or not np.array_equal(_row_hash(df.iloc[:n_done], self._hash_cols), self._row_hash)):
+                # sheet dipotong / baris lama diubah (isi kolom mana pun) -> bangun ulang
+                self._reset()
+                n_done = 0
+            new_rows = df.iloc[n_done:]
+            if new_rows.empty:
+                return 0
+            if self._hash_cols is None:
+                self._hash_cols = list(df.columns)
+            self._row_hash = np.concatenate([self._row_hash, _row_hash(new_rows, self._hash_cols)])
+
+            ts, te, ss, se = rect_arrays(new_rows)
+            times = new_rows["tanggal"].to_numpy(dtype="datetime64[ns]").view("int64")
+            self_overlap = overlap_mask(ts, te, ss, se, ts, te, ss, se, self.rule)
+            for i, (a, b, c, d, t, dedup) in enumerate(zip(ts.tolist(), te.tolist(), ss.tolist(), se.tolist(),
+                                                          times.tolist(), self_overlap.tolist())):
+                key = _geom_key(a, b, c, d) if dedup else None
+                gid = self._geom_ids.get(key) if dedup else None
+                if gid is None:
+                    gid = len(self._geoms)
+                    self._geoms.append((a, b, c, d))
+                    self._occurrences.append([])
+                    if dedup:
+                        self._geom_ids[key] = gid
+                bisect.insort(self._occurrences[gid], (t, n_done + i))
+
+            self.frame = new_rows.copy() if self.frame is None else pd.concat([self.frame, new_rows])
+            latest = new_rows["tanggal"].max()
+            if pd.isna(self.last_tanggal) or (pd.notna(latest) and latest > self.last_tanggal):
+                self.last_tanggal = latest
+            return len(new_rows)
+
+    def resolve(self, before=None) -> pd.DataFrame:
+        """Pile terpilih (terbaru -> terlama) dari baris dengan tanggal < `before`."""
+        with self._lock:
+            if self.frame is None:
+                return pd.DataFrame()
+            limit = (pd.Timestamp(before).value, -1) if before is not None else None
+            picks = []
+            for gid, occ in enumerate(self._occurrences):
+                j = bisect.bisect_left(occ, limit) if limit is not None else len(occ)
+                if j == 0:
+                    continue
+                t, pos = occ[j - 1]
+                if limit is not None and t == NAT_NS:
+                    continue
+                picks.append((t, pos, gid))
+            if not picks:
+                return self.frame.iloc[[]].copy()
+
+            picks.sort(reverse=True)
+            geoms = np.array([self._geoms[gid] for _, _, gid in picks], dtype=float)
+            kept = latest_nonoverlapping(geoms[:, 0], geoms[:, 1], geoms[:, 2], geoms[:, 3], rule=self.rule)
+            return self.frame.iloc[[picks[k][1] for k in kept.tolist()]].copy()
+
+    def resolve_sweep(self, befores, window=None) -> list:
+        """
+        Posisi baris (di `frame`) pile terpilih seperti `resolve(before)`, untuk setiap
+        `before` di `befores` (urut naik), dalam satu sapuan maju: kemunculan terbaru
+        per geometri diperbarui bertahap, dan seleksi overlap hanya diulang kalau ada
+        baris baru sebelum `before` berikutnya. Kalau tidak ada, array sebelumnya
+        (objek yang sama) dipakai lagi.
+
+        `window` (Timedelta) membatasi hasil ke pile bertanggal >= tanggal terakhir
+        sebelum `before` dikurangi `window`. Seleksi terbaru-dulu tidak pernah membiarkan
+        pile lama menggeser pile yang lebih baru, jadi seleksi cukup dijalankan atas
+        kandidat di jendela itu: biaya per tanggal mengikuti isi jendela, bukan history.
+        """
+        with self._lock:
+            kept = np.empty(0, dtype=np.intp)
+            if self.frame is None:
+                return [kept for _ in befores]
+            occ = np.array([(t, pos, gid) for gid, o in enumerate(self._occurrences) for t, pos in o if t != NAT_NS],
+                           dtype=np.int64).reshape(-1, 3)
+            occ = occ[np.lexsort((occ[:, 1], occ[:, 0]))]  # urut (tanggal, posisi) seperti isi _occurrences
+            geoms = np.array(self._geoms, dtype=float).reshape(-1, 4)
+            latest_t = np.full(len(geoms), NAT_NS, dtype=np.int64)
+            latest_pos = np.full(len(geoms), -1, dtype=np.int64)
+            span = NAT_NS if window is None else pd.Timedelta(window).value
+            cutoff = NAT_NS
+            out, k = [], 0
+            for before in befores:
+                stop = int(np.searchsorted(occ[:, 0], pd.Timestamp(before).value, side="left"))
+                if stop > k:
+                    # kemunculan terakhir tiap geometri di potongan ini menimpa yang lama
+                    gids = occ[k:stop, 2][::-1]
+                    gids, last = np.unique(gids, return_index=True)
+                    latest_t[gids] = occ[stop - 1 - last, 0]
+                    latest_pos[gids] = occ[stop - 1 - last, 1]
+                    k = stop
+                    if window is not None:
+                        cutoff = occ[stop - 1, 0] - span  # occ urut tanggal: baris terakhir = tanggal terakhir
+                    picks = np.flatnonzero((latest_pos >= 0) & (latest_t >= cutoff))
+                    picks = picks[np.lexsort((latest_pos[picks], latest_t[picks]))[::-1]]  # terbaru dulu
+                    g = geoms[picks]
+                    sel = latest_nonoverlapping(g[:, 0], g[:, 1], g[:, 2], g[:, 3], rule=self.rule)
+                    kept = latest_pos[picks[sel]].astype(np.intp)
+                out.append(kept)
+            return out
+
+
+def _row_hash(df: pd.DataFrame, columns) -> np.ndarray:
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+def _tiang_bounds(start: pd.Series, end: pd.Series):
+    # nomor tiang bulat seperti int() lama (dipotong ke arah nol), rentang inklusif
+    return (np.trunc(start.to_numpy(dtype=float)).astype(np.int64),
+            np.trunc(end.to_numpy(dtype=float)).astype(np.int64))
+
+
+def _boom_rows(df_reclaimer: pd.DataFrame):
+    """Baris reclaimer yang lengkap, urut tanggal lama -> baru (stabil; tanggal kosong paling lama)."""
+    rows = df_reclaimer.dropna(subset=["tiang_awal", "tiang_ahir", "ketinggian_boom"])
+    times = rows["tanggal"].to_numpy(dtype="datetime64[ns]").view("int64")
+    order = np.argsort(times, kind="stable")
+    return rows.iloc[order], times[order]
+
+
+class BoomProfile:
+    """
+    Ketinggian boom terbaru per tiang sebagai array padat (indeks = tiang - `base`).
+
+    Baris reclaimer (urut tanggal) diterapkan dengan assignment rentang NumPy;
+    baris yang lebih baru menimpa tiang yang sama. `apply` bisa dipanggil
+    bertahap untuk menyapu banyak tanggal sekali jalan.
+    """
+
+    def __init__(self, rows: pd.DataFrame):
+        self.rows = rows
+        self.lo, self.hi = _tiang_bounds(rows["tiang_awal"], rows["tiang_ahir"])
+        self.base = int(self.lo.min()) if len(rows) else 0
+        size = int(self.hi.max()) - self.base + 1 if len(rows) else 0
+        self.last = np.full(max(size, 0), -1, dtype=np.int64)  # posisi baris terakhir per tiang
+        self.applied = 0
+
+    def apply(self, stop: int):
+        """Terapkan baris `applied` .. `stop - 1`."""
+        for i in range(self.applied, stop):
+            a, b = self.lo[i] - self.base, self.hi[i] - self.base
+            if b >= a:
+                self.last[a:b + 1] = i
+        self.applied = max(self.applied, stop)
+
+    def frame(self, grid: OccupancyGrid | None = None) -> pd.DataFrame:
+        """Ketinggian per tiang (urut tiang); kolom `tipe` (pile terbaru di tiang itu) diisi dari `grid`."""
+        idx = np.flatnonzero(self.last >= 0)
+        pick = self.last[idx]
+        grup = self.rows["grup"].to_numpy(dtype=object)[pick] if "grup" in self.rows.columns else "N/A"
+        out = pd.DataFrame({
+            "tanggal": self.rows["tanggal"].to_numpy()[pick],
+            "grup": grup,
+            "tiang": idx + self.base,
+            "ketinggian_boom": self.rows["ketinggian_boom"].to_numpy()[pick],
+        })
+        if grid is not None:
+            out["tipe"] = grid.column_tipe(out["tiang"]).to_numpy()
+        return out
+
+
+def boom_heights(df_reclaimer: pd.DataFrame, piles: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    Ketinggian boom terbaru per tiang dari semua baris reclaimer (tanggal kembar:
+    baris sheet yang lebih bawah menang). Dengan `piles`, tipe batubara per tiang ikut diisi.
+    """
+    rows, _ = _boom_rows(df_reclaimer)
+    profile = BoomProfile(rows)
+    profile.apply(len(rows))
+    return profile.frame(OccupancyGrid(piles) if piles is not None else None)
+
+
+@dataclass
+class YardSnapshot:
+    """Kondisi yard pada satu tanggal."""
+    piles: pd.DataFrame           # pile terpilih (jendela 1 bulan), urut tiang_start
+    reclaimer: pd.Series | None   # posisi reclaimer terakhir
+    boom: pd.DataFrame            # ketinggian boom terbaru + tipe pile per tiang
+    grid: OccupancyGrid           # raster okupansi dari `piles`
+
+
+def sorted_mapping_times(yard_state: YardState) -> np.ndarray:
+    """Tanggal baris mapping yang sudah diproses, terurut (tanpa tanggal kosong)."""
+    if yard_state.frame is None:
+        return np.array([], dtype="datetime64[ns]")
+    return np.sort(yard_state.frame["tanggal"].dropna().to_numpy(dtype="datetime64[ns]"))
+
+
+def piles_as_of(yard_state: YardState, date, window_days=30, mapping_times=None) -> pd.DataFrame:
+    """
+    Pile terpilih dari baris mapping s/d akhir hari `date`, dibatasi `window_days` hari
+    dari data mapping terakhir, urut tiang_start. `mapping_times` (tanggal mapping
+    terurut) boleh diisi supaya tidak dihitung ulang per tanggal.
+    """
+    if yard_state.frame is None:
+        return pd.DataFrame(columns=["tanggal", "tipe"] + RECT_COLS)
+    if mapping_times is None:
+        mapping_times = sorted_mapping_times(yard_state)
+    next_day = np.datetime64(pd.Timestamp(date).normalize() + pd.Timedelta(days=1), "ns")
+    piles = yard_state.resolve(before=next_day)
+    j = np.searchsorted(mapping_times, next_day, side="left")
+    if j and not piles.empty:
+        latest_date = pd.Timestamp(mapping_times[j - 1])
+        piles = piles[piles["tanggal"].between(latest_date - pd.Timedelta(days=window_days), latest_date)]
+    else:
+        piles = piles.iloc[[]]
+    return piles.sort_values("tiang_start", ascending=True)
+
+
+def piles_history(yard_state: YardState, dates, window_days=30) -> list:
+    """
+    `piles_as_of` untuk banyak tanggal sekaligus (hasil sejajar `dates`). Tanggal
+    diringkas ke hari kalender unik lalu disapu sekali dengan `resolve_sweep`
+    (seleksi hanya atas kandidat di jendela `window_days`). Hari yang tidak menambah
+    baris mapping sejak hari sebelumnya mendapat objek DataFrame yang sama, jadi
+    turunannya (mis. raster okupansi) cukup dihitung sekali per himpunan pile.
+    """
+    if yard_state.frame is None:
+        return [piles_as_of(yard_state, date, window_days) for date in dates]
+    next_days = (pd.DatetimeIndex(dates).normalize() + pd.Timedelta(days=1)).asi8
+    days, inverse = np.unique(next_days, return_inverse=True)
+    sweep = yard_state.resolve_sweep(pd.DatetimeIndex(days), window=pd.Timedelta(days=window_days))
+    per_day, piles, prev = [], None, None
+    for kept in sweep:
+        if kept is not prev:
+            piles = yard_state.frame.iloc[kept].sort_values("tiang_start", ascending=True)
+            prev = kept
+        per_day.append(piles)
+    return [per_day[d] for d in inverse.tolist()]
+
+
+class SnapshotBuilder:
+    """
+    YardSnapshot per tanggal, dibangun saat pertama diminta (`builder[tanggal]`) lalu
+    diingat. Halaman hanya membayar tanggal yang dipilih / diputar, bukan semua tanggal.
+
+    Pile diambil dari baris mapping s/d akhir hari tersebut, lalu dibatasi
+    `window_days` hari dari data mapping terakhir. Reclaimer dan boom memakai
+    baris dengan tanggal <= tanggal tersebut, sama seperti filter di halaman.
+    Profil boom disapu maju; minta tanggal yang lebih awal dari sapuan terakhir
+    membuat sapuan diulang dari awal. Untuk banyak tanggal sekaligus (playback),
+    `prefetch` mengambil pile semua tanggal dengan satu `piles_history`.
+    """
+
+    def __init__(self, yard_state: YardState, df_reclaimer: pd.DataFrame, window_days=30):
+        self.yard_state = yard_state
+        self.window_days = window_days
+        self._mapping_times = sorted_mapping_times(yard_state)
+        self._recl_valid = df_reclaimer.dropna(subset=["tiang_awal", "tiang_ahir", "tanggal"]).sort_values("tanggal", kind="stable")
+        self._recl_times = self._recl_valid["tanggal"].to_numpy(dtype="datetime64[ns]")
+        boom_rows, self._boom_times = _boom_rows(df_reclaimer)
+        self._boom_rows = boom_rows
+        self._boom = self._new_boom()
+        self._snapshots = {}
+        self._grid = (None, None)  # (piles, grid) terakhir; pile yang sama tidak di-raster ulang
+        self._lock = threading.Lock()
+
+    def _new_boom(self) -> BoomProfile:
+        boom = BoomProfile(self._boom_rows)
+        boom.applied = int(np.searchsorted(self._boom_times, NAT_NS, side="right"))  # tanggal kosong tidak ikut filter <= tanggal
+        return boom
+
+    def __getitem__(self, date) -> YardSnapshot:
+        day = pd.Timestamp(date)
+        with self._lock:
+            snapshot = self._snapshots.get(day)
+            if snapshot is None:
+                snapshot = self._snapshots[day] = self._build(day)
+            return snapshot
+
+    def prefetch(self, dates):
+        """Bangun sekaligus snapshot `dates` yang belum ada (urut lama -> baru)."""
+        with self._lock:
+            days = sorted({pd.Timestamp(d) for d in dates} - self._snapshots.keys())
+            for day, piles in zip(days, piles_history(self.yard_state, days, self.window_days)):
+                self._snapshots[day] = self._build(day, piles)
+
+    def _build(self, day: pd.Timestamp, piles: pd.DataFrame | None = None) -> YardSnapshot:
+        if piles is None:
+            piles = piles_as_of(self.yard_state, day, self.window_days, self._mapping_times)
+
+        # reclaimer terakhir; kalau tanggal kembar ambil baris pertama (seperti idxmax)
+        k = np.searchsorted(self._recl_times, np.datetime64(day, "ns"), side="right")
+        reclaimer = None
+        if k:
+            first = np.searchsorted(self._recl_times, self._recl_times[k - 1], side="left")
+            reclaimer = self._recl_valid.iloc[first]
+
+        stop = int(np.searchsorted(self._boom_times, day.value, side="right"))
+        if stop < self._boom.applied:
+            self._boom = self._new_boom()
+        self._boom.apply(stop)
+        grid = self._grid[1] if self._grid[0] is piles else OccupancyGrid(piles)
+        self._grid = (piles, grid)
+        return YardSnapshot(piles=piles, reclaimer=reclaimer, boom=self._boom.frame(grid), grid=grid)
+
+
+def build_snapshots(dates, yard_state: YardState, df_reclaimer: pd.DataFrame, window_days=30) -> dict:
+    """YardSnapshot untuk setiap tanggal di `dates` sekaligus (satu sapuan pile & boom, urut lama -> baru)."""
+    builder = SnapshotBuilder(yard_state, df_reclaimer, window_days)
+    builder.prefetch(dates)
+    return {pd.Timestamp(date): builder[date] for date in sorted(dates)}